@@ -1,3 +1,5 @@
+from libmatasano import bxor, ManyTimePad
+
 msg_1 = bytes.fromhex('315c4eeaa8b5f8aaf9174145bf43e1784b8fa00dc71d885a804e5ee9fa40b16349c146fb778cdf2d3aff021dfff5b403b510d0d0455468aeb98622b137dae857553ccd8883a7bc37520e06e515d22c954eba5025b8cc57ee59418ce7dc6bc41556bdb36bbca3e8774301fbcaa3b83b220809560987815f65286764703de0f3d524400a19b159610b11ef3e')
 msg_2 = bytes.fromhex('234c02ecbbfbafa3ed18510abd11fa724fcda2018a1a8342cf064bbde548b12b07df44ba7191d9606ef4081ffde5ad46a5069d9f7f543bedb9c861bf29c7e205132eda9382b0bc2c5c4b45f919cf3a9f1cb74151f6d551f4480c82b2cb24cc5b028aa76eb7b4ab24171ab3cdadb8356f')
 msg_3 = bytes.fromhex('32510ba9a7b2bba9b8005d43a304b5714cc0bb0c8a34884dd91304b8ad40b62b07df44ba6e9d8a2368e51d04e0e7b207b70b9b8261112bacb6c866a232dfe257527dc29398f5f3251a0d47e503c66e935de81230b59b7afb5f41afa8d661cb')
@@ -14,43 +16,12 @@ msg_target = bytes.fromhex('32510ba9babebbbefd001547a810e67149caee11d945cd7fc81a
 msgs = [msg_1, msg_2, msg_3, msg_4, msg_5, msg_6, msg_7, msg_8, msg_9, msg_10]
 
 def bytesxor(a, b):
-    if len(a) > len(b):
-       return bytes([x ^ y for (x, y) in zip(a[:len(b)], b)])
-    else:
-       return bytes([x ^ y for (x, y) in zip(a, b[:len(a)])])
-
-key = [0] * len(msg_7)
-
-def isalpha(b):
-    return (ord('a') <= b <= ord('z')) or (ord('A') <= b <= ord('Z'))
+    return bxor(a, b, longest=False)
 
-for i, msg_i in enumerate(msgs):
-    may_not_space = [0] * len(msg_i)
-    for j, msg_j in enumerate(msgs):
-        if i != j:
-            xored = bytesxor(msg_i, msg_j)
-            for k, xb in enumerate(xored):
-                if (not isalpha(xb)) and xb != 0:
-                    may_not_space[k] += 1
-    
-    for j, may_not in enumerate(may_not_space):
-        if may_not <= 2:
-            key_byte = msg_i[j] ^ ord(' ')
-            if key[j] == 0:
-                key[j] = key_byte
-                continue
-            
-            if key[j] != key_byte:
-                reliable = True
-                for m in msgs:
-                    if j >= len(m):
-                        continue
-                    byte = m[j] ^ key_byte
-                    if not isalpha(byte) and byte != ord(' '):
-                        reliable = False
-                        break
-                if reliable:
-                    key[j] = key_byte
+# 所有密文（包括目标密文）放进同一个矩阵里统计“可能是空格”的证据
+pad = ManyTimePad(msgs)
+pad.add([msg_target])
+key = list(pad.key()[0][:len(msg_7)])
 
 print(key)
 print(bytesxor(bytes(key), msg_target))
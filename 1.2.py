@@ -1,6 +1,9 @@
 
 import os
 
+from libmatasano import (bxor, byte_weights, rank_single_byte_xor_keys,
+                         break_repeating_key_xor)
+
 hex_cipher = 'F96DE8C227A259C87EE1DA2AED57C93FE5DA36ED4EC87EF2C63AAE5B9A7EFFD673BE4ACF7BE8923CAB1ECE7AF2DA3DA44FCF7AE29235A24C963FF0DF3CA3599A70E5DA36BF1ECE77F8DC34BE129A6CF4D126BF5B9A7CFEDF3EB850D37CF0C63AA2509A76FF9227A55B9A6FE3D720A850D97AB1DD35ED5FCE6BF0D138A84CC931B1F121B44ECE70F6C032BD56C33FF9D320ED5CDF7AFF9226BE5BDE3FF7DD21ED56CF71F5C036A94D963FF8D473A351CE3FE5DA3CB84DDB71F5C17FED51DC3FE8D732BF4D963FF3C727ED4AC87EF5DB27A451D47EFD9230BF47CA6BFEC12ABE4ADF72E29224A84CDF3FF5D720A459D47AF59232A35A9A7AE7D33FB85FCE7AF5923AA31EDB3FF7D33ABF52C33FF0D673A551D93FFCD33DA35BC831B1F43CBF1EDF67F0DF23A15B963FE5DA36ED68D378F4DC36BF5B9A7AFFD121B44ECE76FEDC73BE5DD27AFCD773BA5FC93FE5DA3CB859D26BB1C63CED5CDF3FE2D730B84CDF3FF7DD21ED5ADF7CF0D636BE1EDB79E5D721ED57CE3FE6D320ED57D469F4DC27A85A963FF3C727ED49DF3FFFDD24ED55D470E69E73AC50DE3FE5DA3ABE1EDF67F4C030A44DDF3FF5D73EA250C96BE3D327A84D963FE5DA32B91ED36BB1D132A31ED87AB1D021A255DF71B1C436BF479A7AF0C13AA14794'
 def read_hex_from_file(fname="ctext_hex.txt"):
     if not os.path.exists(fname):
@@ -30,38 +33,27 @@ def score_english(bs: bytes):
             score -= 5
     return score
 
+# score_english 对每个字节独立打分，可以预先算出 256 个字节的分数
+ENGLISH_WEIGHTS = byte_weights(score_english)
+
 def break_single_byte_xor(block: bytes):
-    best_k = None
-    best_pt = None
-    best_score = float("-inf")
-    for k in range(256):
-        pt = bytes([b ^ k for b in block])
-        s = score_english(pt)
-        if s > best_score:
-            best_k, best_pt, best_score = k, pt, s
-    return best_k, best_pt, best_score
+    best = rank_single_byte_xor_keys(block, ENGLISH_WEIGHTS)[0]
+    return best['key'], bxor(block, best['key']), best['score']
 
 def break_with_keysize(data: bytes, keysize: int):
-    # 转置字节：构造每个密钥位置对应的列
-    transposed = []
-    for i in range(keysize):
-        col = bytes([data[j] for j in range(i, len(data), keysize)])
-        transposed.append(col)
+    # 转置字节：data[i::keysize] 就是密钥第 i 个字节对应的列
     key_bytes = bytearray()
-    for col in transposed:
-        kbyte, _, _ = break_single_byte_xor(col)
+    for i in range(keysize):
+        kbyte, _, _ = break_single_byte_xor(data[i::keysize])
         key_bytes.append(kbyte)
-    plaintext = bytes([data[i] ^ key_bytes[i % keysize] for i in range(len(data))])
+    plaintext = bxor(data, key_bytes, repeat=True)
     return bytes(key_bytes), plaintext, score_english(plaintext)
 
-def crack_repeating_xor(hex_ciphertext: str, min_k=1, max_k=13):
+def crack_repeating_xor(hex_ciphertext: str, min_k=1, max_k=13, top_k=3, workers=1):
+    # 只保留得分最高的 top_k 个候选，明文只为最终结果解密
     data = bytes.fromhex(hex_ciphertext)
-    cand = []
-    for k in range(min_k, max_k+1):
-        key, pt, sc = break_with_keysize(data, k)
-        cand.append({'keysize': k, 'key': key, 'plaintext': pt, 'score': sc})
-    cand.sort(key=lambda x: x['score'], reverse=True)
-    return cand
+    return break_repeating_key_xor(data, range(min_k, max_k + 1), ENGLISH_WEIGHTS,
+                                   top_k=top_k, workers=workers)
 
 def main():
     global hex_cipher
@@ -72,6 +64,7 @@ def main():
             return
     results = crack_repeating_xor(hex_cipher, 1, 13)
     best = results[0]
+    best['plaintext'] = bxor(bytes.fromhex(hex_cipher), best['key'], repeat=True)
     print("Best keysize:", best['keysize'])
     print("Key (bytes):", best['key'])
     try:
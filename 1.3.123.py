@@ -1,5 +1,7 @@
 import base64
 
+from libmatasano import bxor, byte_weights, rank_single_byte_xor_keys
+
 # =========================
 # 第1题：十六进制 → Base64
 # =========================
@@ -16,37 +18,29 @@ def fixed_xor(hex_str1, hex_str2):
     b2 = bytes.fromhex(hex_str2)
     if len(b1) != len(b2):
         raise ValueError("输入的两个十六进制字符串长度必须一致！")
-    return bytes([x ^ y for x, y in zip(b1, b2)]).hex()
+    return bxor(b1, b2).hex()
 
 
 # =========================
 # 第3题：单字节异或破解
 # =========================
 def single_byte_xor(cipher_bytes, key):
-    return bytes([b ^ key for b in cipher_bytes])
+    return bxor(cipher_bytes, key)
 
 def score_text(text):
     """简单英文打分函数"""
     freq_chars = b'ETAOIN SHRDLUetaoinshrdlu '
     return sum([chr(b) in freq_chars.decode() for b in text])
 
+TEXT_WEIGHTS = byte_weights(score_text)
+
 def break_single_byte_xor(hex_str):
     cipher_bytes = bytes.fromhex(hex_str)
-    best_score = 0
-    best_key = None
-    best_text = None
-
-    for key_candidate in range(256):
-        plaintext_candidate = single_byte_xor(cipher_bytes, key_candidate)
-        try:
-            score = score_text(plaintext_candidate)
-            if score > best_score:
-                best_score = score
-                best_key = key_candidate
-                best_text = plaintext_candidate.decode('utf-8', errors='ignore')
-        except UnicodeDecodeError:
-            continue
-    return best_key, best_text, best_score
+    best = rank_single_byte_xor_keys(cipher_bytes, TEXT_WEIGHTS)[0]
+    if best['score'] <= 0:
+        return None, None, 0
+    best_text = single_byte_xor(cipher_bytes, best['key']).decode('utf-8', errors='ignore')
+    return best['key'], best_text, best['score']
 
 
 
@@ -1,58 +1,42 @@
 import base64
 
+from libmatasano import bxor, byte_weights, rank_single_byte_xor_keys, detect_single_byte_xor
+
 # ========== 通用函数（从前面复用） ==========
 def single_byte_xor(cipher_bytes, key):
-    return bytes([b ^ key for b in cipher_bytes])
+    return bxor(cipher_bytes, key)
 
 def score_text(text):
     freq_chars = b'ETAOIN SHRDLUetaoinshrdlu '
     return sum([chr(b) in freq_chars.decode() for b in text])
 
+TEXT_WEIGHTS = byte_weights(score_text)
+
 def break_single_byte_xor(hex_str):
     cipher_bytes = bytes.fromhex(hex_str)
-    best_score = 0
-    best_key = None
-    best_text = None
-
-    for key_candidate in range(256):
-        plaintext_candidate = single_byte_xor(cipher_bytes, key_candidate)
-        try:
-            score = score_text(plaintext_candidate)
-            if score > best_score:
-                best_score = score
-                best_key = key_candidate
-                best_text = plaintext_candidate.decode('utf-8', errors='ignore')
-        except UnicodeDecodeError:
-            continue
-
-    return best_key, best_text, best_score
+    best = rank_single_byte_xor_keys(cipher_bytes, TEXT_WEIGHTS)[0]
+    if best['score'] <= 0:
+        return None, None, 0
+    best_text = single_byte_xor(cipher_bytes, best['key']).decode('utf-8', errors='ignore')
+    return best['key'], best_text, best['score']
 
 
 # ========== 第4题：检测单字节异或加密行 ==========
-def detect_single_char_xor(file_path):
-    import re
-    best_overall = {'line': 0, 'score': 0, 'key': None, 'text': None}
-    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-        for i, raw_line in enumerate(f, start=1):
-            # 清理行内容，只保留十六进制字符
-            line = re.sub(r'[^0-9A-Fa-f]', '', raw_line.strip())
-            if not line:
-                continue
-            try:
-                key, text, score = break_single_byte_xor(line)
-                if score > best_overall['score']:
-                    best_overall = {'line': i, 'score': score, 'key': key, 'text': text}
-            except Exception:
-                continue
-    return best_overall
+def detect_single_char_xor(file_path, workers=1):
+    # 分块读取文件，按批打分，只保留得分最高的一行
+    best = detect_single_byte_xor(file_path, TEXT_WEIGHTS, top_k=1, workers=workers)
+    if not best or best[0]['score'] <= 0:
+        return {'line': 0, 'score': 0, 'key': None, 'text': None}
+    best = best[0]
+    return {'line': best['line'], 'score': best['score'], 'key': best['key'],
+            'text': best['message'].decode('utf-8', errors='ignore')}
 
 
 
 # ========== 第5题：重复密钥 XOR ==========
 def repeating_key_xor(plaintext, key):
     """使用重复key进行异或加密"""
-    result = bytes([p ^ key[i % len(key)] for i, p in enumerate(plaintext)])
-    return result.hex()
+    return bxor(plaintext, key, repeat=True).hex()
 
 
 # ========== 主函数（演示4、5题） ==========
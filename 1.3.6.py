@@ -1,8 +1,11 @@
 
 import base64
-from itertools import combinations
 from collections import Counter
 
+from libmatasano import (bxor, byte_weights, rank_single_byte_xor_keys, hamming_distance,
+                         estimate_keysizes,
+                         break_repeating_key_xor as break_repeating_key_xor_engine)
+
 # 把 base64 密文读入
 b64 = """HUIfTQsPAh9PE048GmllH0kcDk4TAQsHThsBFkU2AB4BSWQgVB0dQzNTTmVS BgBHVBwNRU0HBAxTEjwMHghJGgkRTxRMIRpHKwAFHUdZEQQJAGQmB1MANxYG DBoXQR0BUlQwXwAgEwoFR08SSAhFTmU+Fgk4RQYFCBpGB08fWXh+amI2DB0P QQ1IBlUaGwAdQnQEHgFJGgkRAlJ6f0kASDoAGhNJGk9FSA8dDVMEOgFSGQEL QRMGAEwxX1NiFQYHCQdUCxdBFBZJeTM1CxsBBQ9GB08dTnhOSCdSBAcMRVhI CEEATyBUCHQLHRlJAgAOFlwAUjBpZR9JAgJUAAELB04CEFMBJhAVTQIHAh9P G054MGk2UgoBCVQGBwlTTgIQUwg7EAYFSQ8PEE87ADpfRyscSWQzT1QCEFMa TwUWEXQMBk0PAg4DQ1JMPU4ALwtJDQhOFw0VVB1PDhxFXigLTRkBEgcKVVN4 Tk9iBgELR1MdDAAAFwoFHww6Ql5NLgFBIg4cSTRWQWI1Bk9HKn47CE8BGwFT QjcEBx4MThUcDgYHKxpUKhdJGQZZVCFFVwcDBVMHMUV4LAcKQR0JUlk3TwAm HQdJEwATARNFTg5JFwQ5C15NHQYEGk94dzBDADsdHE4UVBUaDE5JTwgHRTkA Umc6AUETCgYAN1xGYlUKDxJTEUgsAA0ABwcXOwlSGQELQQcbE0c9GioWGgwc AgcHSAtPTgsAABY9C1VNCAINGxgXRHgwaWUfSQcJABkRRU8ZAUkDDTUWF01j OgkRTxVJKlZJJwFJHQYADUgRSAsWSR8KIgBSAAxOABoLUlQwW1RiGxpOCEtU YiROCk8gUwY1C1IJCAACEU8QRSxORTBSHQYGTlQJC1lOBAAXRTpCUh0FDxhU ZXhzLFtHJ1JbTkoNVDEAQU4bARZFOwsXTRAPRlQYE042WwAuGxoaAk5UHAoA ZCYdVBZ0ChQLSQMYVAcXQTwaUy1SBQsTAAAAAAAMCggHRSQJExRJGgkGAAdH MBoqER1JJ0dDFQZFRhsBAlMMIEUHHUkPDxBPH0EzXwArBkkdCFUaDEVHAQAN U29lSEBAWk44G09fDXhxTi0RAk4ITlQbCk0LTx4cCjBFeCsGHEETAB1EeFZV IRlFTi4AGAEORU4CEFMXPBwfCBpOAAAdHUMxVVUxUmM9ElARGgZBAg4PAQQz DB4EGhoIFwoKUDFbTCsWBg0OTwEbRSonSARTBDpFFwsPCwIATxNOPBpUKhMd Th5PAUgGQQBPCxYRdG87TQoPD1QbE0s9GkFiFAUXR0cdGgkADwENUwg1DhdN AQsTVBgXVHYaKkg7TgNHTB0DAAA9DgQACjpFX0BJPQAZHB1OeE5PYjYMAg5M FQBFKjoHDAEAcxZSAwZOBREBC0k2HQxiKwYbR0MVBkVUHBZJBwp0DRMDDk5r NhoGACFVVWUeBU4MRREYRVQcFgAdQnQRHU0OCxVUAgsAK05ZLhdJZChWERpF QQALSRwTMRdeTRkcABcbG0M9Gk0jGQwdR1ARGgNFDRtJeSchEVIDBhpBHQlS WTdPBzAXSQ9HTBsJA0UcQUl5bw0KB0oFAkETCgYANlVXKhcbC0sAGgdFUAIO ChZJdAsdTR0HDBFDUk43GkcrAAUdRyonBwpOTkJEUyo8RR8USSkOEENSSDdX RSAdDRdLAA0HEAAeHQYRBDYJC00MDxVUZSFQOV1IJwYdB0dXHRwNAA9PGgMK OwtTTSoBDBFPHU54W04mUhoPHgAdHEQAZGU/OjV6RSQMBwcNGA5SaTtfADsX GUJHWREYSQAnSARTBjsIGwNOTgkVHRYANFNLJ1IIThVIHQYKAGQmBwcKLAwR DB0HDxNPAU94Q083UhoaBkcTDRcAAgYCFkU1RQUEBwFBfjwdAChPTikBSR0T TwRIEVIXBgcURTULFk0OBxMYTwFUN0oAIQAQBwkHVGIzQQAGBR8EdCwRCEkH ElQcF0w0U05lUggAAwANBxAAHgoGAwkxRRMfDE4DARYbTn8aKmUxCBsURVQf DVlOGwEWRTIXFwwCHUEVHRcAMlVDKRsHSUdMHQMAAC0dCAkcdCIeGAxOazkA BEk2HQAjHA1OAFIbBxNJAEhJBxctDBwKSRoOVBwbTj8aQS4dBwlHKjUECQAa BxscEDMNUhkBC0ETBxdULFUAJQAGARFJGk9FVAYGGlMNMRcXTRoBDxNPeG43 TQA7HRxJFUVUCQhBFAoNUwctRQYFDE43PT9SUDdJUydcSWRtcwANFVAHAU5T FjtFGgwbCkEYBhlFeFsABRcbAwZOVCYEWgdPYyARNRcGAQwKQRYWUlQwXwAg ExoLFAAcARFUBwFOUwImCgcDDU5rIAcXUj0dU2IcBk4TUh0YFUkASEkcC3QI GwMMQkE9SB8AMk9TNlIOCxNUHQZCAAoAHh1FXjYCDBsFABkOBkk7FgALVQRO D0EaDwxOSU8dGgI8EVIBAAUEVA5SRjlUQTYbCk5teRsdRVQcDhkDADBFHwhJ AQ8XClJBNl4AC1IdBghVEwARABoHCAdFXjwdGEkDCBMHBgAwW1YnUgAaRyon B0VTGgoZUwE7EhxNCAAFVAMXTjwaTSdSEAESUlQNBFJOZU5LXHQMHE0EF0EA Bh9FeRp5LQdFTkAZREgMU04CEFMcMQQAQ0lkay0ABwcqXwA1FwgFAk4dBkIA CA4aB0l0PD1MSQ8PEE87ADtbTmIGDAILAB0cRSo3ABwBRTYKFhROHUETCgZU MVQHYhoGGksABwdJAB0ASTpFNwQcTRoDBBgDUkksGioRHUkKCE5THEVCC08E EgF0BBwJSQoOGkgGADpfADETDU5tBzcJEFMLTx0bAHQJCx8ADRJUDRdMN1RH YgYGTi5jMURFeQEaSRAEOkURDAUCQRkKUmQ5XgBIKwYbQFIRSBVJGgwBGgtz RRNNDwcVWE8BT3hJVCcCSQwGQx9IBE4KTwwdASEXF01jIgQATwZIPRpXKwYK BkdEGwsRTxxDSToGMUlSCQZOFRwKUkQ5VEMnUh0BR0MBGgAAZDwGUwY7CBdN HB5BFwMdUz0aQSwWSQoITlMcRUILTxoCEDUXF01jNw4BTwVBNlRBYhAIGhNM EUgIRU5CRFMkOhwGBAQLTVQOHFkvUkUwF0lkbXkbHUVUBgAcFA0gRQYFCBpB PU8FQSsaVycTAkJHYhsRSQAXABxUFzFFFggICkEDHR1OPxoqER1JDQhNEUgK TkJPDAUAJhwQAg0XQRUBFgArU04lUh0GDlNUGwpOCU9jeTY1HFJARE4xGA4L ACxSQTZSDxsJSw1ICFUdBgpTNjUcXk0OAUEDBxtUPRpCLQtFTgBPVB8NSRoK SREKLUUVAklkERgOCwAsUkE2Ug8bCUsNSAhVHQYKUyI7RQUFABoEVA0dWXQa Ry1SHgYOVBFIB08XQ0kUCnRvPgwQTgUbGBwAOVREYhAGAQBJEUgETgpPGR8E LUUGBQgaQRIaHEshGk03AQANR1QdBAkAFwAcUwE9AFxNY2QxGA4LACxSQTZS DxsJSw1ICFUdBgpTJjsIF00GAE1ULB1NPRpPLF5JAgJUVAUAAAYKCAFFXjUe DBBOFRwOBgA+T04pC0kDElMdC0VXBgYdFkU2CgtNEAEUVBwTWXhTVG5SGg8e AB0cRSo+AwgKRSANExlJCBQaBAsANU9TKxFJL0dMHRwRTAtPBRwQMAAATQcB FlRlIkw5QwA2GggaR0YBBg5ZTgIcAAw3SVIaAQcVEU8QTyEaYy0fDE4ITlhI Jk8DCkkcC3hFMQIEC0EbAVIqCFZBO1IdBgZUVA4QTgUWSR4QJwwRTWM="""
 
@@ -10,27 +13,13 @@ b64 = """HUIfTQsPAh9PE048GmllH0kcDk4TAQsHThsBFkU2AB4BSWQgVB0dQzNTTmVS BgBHVBwNRU
 b64_clean = "".join(b64.split())
 cipher = base64.b64decode(b64_clean)
 
-# 汉明距离
-def hamming_distance(b1: bytes, b2: bytes) -> int:
-    assert len(b1) == len(b2)
-    return sum((x ^ y).bit_count() for x, y in zip(b1, b2))
-
 # 题目示例测试
 assert hamming_distance(b"this is a test", b"wokka wokka!!!") == 37
 
-# 猜 keysize
+# 猜 keysize：用整个密文里所有相邻分组的平均汉明距离
 def guess_keysizes(data, min_k=2, max_k=40, top=5):
-    scores = []
-    for k in range(min_k, max_k + 1):
-        blocks = [data[i:i + k] for i in range(0, k * 4, k) if i + k <= len(data)]
-        if len(blocks) < 2:
-            continue
-        pairs = list(combinations(blocks, 2))
-        distances = [hamming_distance(a, b) / k for a, b in pairs]
-        avg = sum(distances) / len(distances)
-        scores.append((avg, k))
-    scores.sort()
-    return scores[:top]
+    return [(c['distance'], c['keysize'])
+            for c in estimate_keysizes(data, range(min_k, max_k + 1), top_k=top)]
 
 # 英文评分顺序（简化）
 english_freq_order = " etaoinshrdlcumwfgypbvkjxqz"
@@ -52,27 +41,19 @@ def score_text(text_bytes: bytes) -> float:
     return score
 
 # 单字节 XOR 破解
+# (score_text 是逐字节累加的，所以可以先算出每个字节的分数)
+TEXT_WEIGHTS = byte_weights(score_text)
+
 def break_single_byte_xor(block: bytes):
-    best = None
-    for key in range(256):
-        xord = bytes([b ^ key for b in block])
-        sc = score_text(xord)
-        if best is None or sc > best[0]:
-            best = (sc, key, xord)
-    return best
+    best = rank_single_byte_xor_keys(block, TEXT_WEIGHTS)[0]
+    return best['score'], best['key'], bxor(block, best['key'])
 
 # 对 repeating-key XOR 破解
 def break_repeating_key_xor(ciphertext: bytes, keysize: int):
-    blocks = [ciphertext[i:i + keysize] for i in range(0, len(ciphertext), keysize)]
-    transposed = []
-    for i in range(keysize):
-        transposed.append(bytes([b[i] for b in blocks if len(b) > i]))
-    key_bytes = []
-    for block in transposed:
-        score, key, _ = break_single_byte_xor(block)
-        key_bytes.append(key)
-    key = bytes(key_bytes)
-    plain = bytes([c ^ key[i % len(key)] for i, c in enumerate(ciphertext)])
+    # 第 i 列就是 ciphertext[i::keysize]
+    key = bytes(break_single_byte_xor(ciphertext[i::keysize])[1]
+                for i in range(keysize))
+    plain = bxor(ciphertext, key, repeat=True)
     return key, plain
 
 # 主程序
@@ -80,14 +61,11 @@ if __name__ == '__main__':
     candidates = guess_keysizes(cipher, 2, 40, top=5)
     print("Top keysize candidates (normalized distance, keysize):", candidates)
 
-    results = []
-    for _, k in candidates:
-        key, plain = break_repeating_key_xor(cipher, k)
-        sc = score_text(plain)
-        results.append((sc, k, key, plain))
-
-    results.sort(reverse=True, key=lambda x: x[0])
-    best_score, best_k, best_key, best_plain = results[0]
+    # 只解密得分最高的那个候选
+    results = break_repeating_key_xor_engine(cipher, [k for _, k in candidates],
+                                             TEXT_WEIGHTS)
+    best_score, best_k, best_key = results[0]['score'], results[0]['keysize'], results[0]['key']
+    best_plain = bxor(cipher, best_key, repeat=True)
     print(f"\nBest keysize: {best_k}, score: {best_score}")
     print("Discovered key (bytes):", best_key)
     try:
@@ -1,12 +1,22 @@
+import os
+import sys
 
-import hashlib
-import itertools
+from libmatasano import search_sha1_preimage
 
 target = "67ae1a64661ac8b4494666f58c4822408dd0a3e4"
 chars = ['(', 'Q', '=', 'w', 'i', 'n', '*', '5']  # 从图片读出的候选键
-# 假设密码长度为 8 且每个按键只按一次 -> permutations
-for perm in itertools.permutations(chars, 8):
-    s = ''.join(perm)
-    if hashlib.sha1(s.encode()).hexdigest() == target:
-        print("FOUND:", s)
-        break
+
+
+def report(progress):
+    print('\r已尝试 %d/%d (%.0f 个/秒)' % (progress['done'], progress['total'], progress['rate']),
+          end='', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    # 假设密码长度为 8 且每个按键只按一次 -> permutations
+    # (按前缀分段，多进程搜索，前缀的 SHA-1 状态只计算一次)
+    result = search_sha1_preimage(target, ''.join(chars), [8], workers=os.cpu_count() or 1,
+                                  progress=report)
+    print(file=sys.stderr)
+    if result is not None:
+        print("FOUND:", result['password'].decode())
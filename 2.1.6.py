@@ -2,13 +2,14 @@ import os
 import random
 from random import randint
 import base64
-from libmatasano import encrypt_aes_128_ecb
+from libmatasano import (encrypt_aes_128_ecb, ecb_oracle_layout, byte_at_a_time_ecb,
+                         InstrumentedOracle)
 
 
 class Oracle:
     def __init__(self):
         self.key = os.urandom(16)
-        self.prefix = os.urandom(randint(1, 15))
+        self.prefix = os.urandom(randint(1, 50))
         self.target = base64.b64decode(
             "Um9sbGluJyBpbiBteSA1LjAKV2l0aCBteSByYWctdG9wIGRvd24gc28gbXkg"
             "aGFpciBjYW4gYmxvdwpUaGUgZ2lybGllcyBvbiBzdGFuZGJ5IHdhdmluZyBq"
@@ -24,74 +25,27 @@ class Oracle:
 
 
 oracle = Oracle()
+# counts the queries and answers the repeated ones without encrypting again
+encrypt = InstrumentedOracle(oracle.encrypt)
 
-# Finding the block size (again)
+# Finding the block size, the prefix size (even longer than one block)
+# and the target size
 
-previous_length = len(oracle.encrypt(b''))
-for i in range(20):
-    length = len(oracle.encrypt(b'X' * i))
-    if length != previous_length:
-        # got it !
-        block_size = length - previous_length
-        # the following quantities will be useful later to compute target length
-        # where "aligned" means a length that is a  multiple of the block size
-        size_prefix_plus_target_aligned = previous_length
-        min_known_ptxt_size_to_align = i
-        break
-else:
-    raise Exception('did not detect any change in ciphertext length')
+layout = ecb_oracle_layout(encrypt)
 
 # just checking we got it right
-assert block_size == 16
+assert layout['block_size'] == 16
+assert layout['prefix_size'] == len(oracle.prefix)
+assert layout['target_size'] == len(oracle.target)
 
-# Finding the prefix size
+# More or less same thing as in challenge 12,
+# but the 256 candidates for each byte are sent in a single query
 
-from libmatasano import split_bytes_in_blocks
+result = byte_at_a_time_ecb(encrypt, layout)
 
-# XXX not ideal as
-# this may not work if the prefix is larger than one block
-# (cannot be the case the way we wrote our oracle, but just saying)
-previous_blocks = None
-for i in range(1, block_size + 1):
-    blocks = split_bytes_in_blocks(oracle.encrypt(b'X' * i), block_size)
-    if previous_blocks != None and blocks[0] == previous_blocks[0]:
-        # we are in the situation where
-        # prefix_size + padding_size - 1 = block_size
-        prefix_size = block_size - i + 1
-        break
-    previous_blocks = blocks
-else:
-    raise Exception('did not detect constant ciphertext block')
-
-# just checking we got it right
-assert prefix_size == len(oracle.prefix)
-
-# now that we have the prefix size we can compute the size of the target
-target_size = size_prefix_plus_target_aligned - min_known_ptxt_size_to_align - prefix_size
-
-assert target_size == len(oracle.target)
-
-# More or less same thing as in challenge 12
-
-know_target_bytes = b""
-for _ in range(target_size):
-    # r+p+k+1 = 0 mod B
-    r = prefix_size
-    k = len(know_target_bytes)
-    padding_length = (-k - 1 - r) % block_size
-    padding = b"X" * padding_length
-
-    # target block plaintext contains only known characters except its last character
-    target_block_number = (k + r) // block_size
-    target_slice = slice(target_block_number * block_size, (target_block_number + 1) * block_size)
-    target_block = oracle.encrypt(padding)[target_slice]
-
-    # trying every possibility for the last character
-    for i in range(2 ** 8):
-        message = padding + know_target_bytes + bytes([i])
-        block = oracle.encrypt(message)[target_slice]
-        if block == target_block:
-            know_target_bytes += bytes([i])
-            break
-
-print(know_target_bytes.decode())
\ No newline at end of file
+print(result['target'].decode())
+print('oracle queries: %d for the layout, %d for %d bytes' % (
+    layout['queries'], sum(result['queries_per_byte']), len(result['target'])))
+stats = encrypt.stats()
+print('%d queries, %d answered from the cache, mean latency %.1f us' % (
+    stats['queries'], stats['cache_hits'], stats['mean_latency'] * 1e6))
@@ -3,6 +3,8 @@
 from Crypto.Cipher import AES
 import os
 
+from libmatasano import attack_padding_oracle
+
 # ---------- 辅助函数 ----------
 def pkcs7_pad(message: bytes, blocksize: int) -> bytes:
     """标准 PKCS#7 填充（包括当 len(message) % blocksize == 0 时填充一整块）。"""
@@ -166,8 +168,28 @@ def cbc_bitflipping_attack() -> bool:
         print("失败：未检测到 ';admin=true;'")
     return success
 
+# ---------- padding oracle 攻击（挑战 17）----------
+def padding_oracle(ciphertext: bytes) -> bool:
+    """is_admin 里的“解密 + 去填充”本身就是一个 padding oracle：只告诉我们填充是否有效。"""
+    try:
+        pkcs7_unpad(cbc_oracle(ciphertext, encrypt=False))
+        return True
+    except ValueError:
+        return False
+
+def padding_oracle_attack():
+    # 只用 padding oracle 解密整个 cookie（所有块同时攻击）
+    ct = cbc_oracle(b'xadminxtruex')
+    result = attack_padding_oracle(ct, padding_oracle, iv=IV)
+    print("padding oracle 解密结果:", result['plaintext'])
+    print("查询次数: %d（平均每字节 %.1f 次）" % (
+        result['queries'], result['queries'] / len(result['queries_per_byte'])))
+    return result['plaintext'] == pkcs7_unpad(cbc_oracle(ct, encrypt=False))
+
 # ---------- 主入口 ----------
 if __name__ == "__main__":
     print("开始 CBC bit-flipping 攻击演示...")
     result = cbc_bitflipping_attack()
     print("最终结果:", result)
+    print("开始 padding oracle 攻击演示...")
+    print("最终结果:", padding_oracle_attack())
@@ -1,27 +1,29 @@
-import math
+import time
+
+from libmatasano import min_unconcealed_exponents
 
 p = 1009
 q = 3643
-phi = (p-1)*(q-1)
-
-def gcd(a, b):
-    while b:
-        a, b = b, a % b
-    return a
-
-min_count = None
-best_es = []
-
-for e in range(2, phi):
-    if gcd(e, phi) != 1:
-        continue
-    count = gcd(e-1, p-1) * gcd(e-1, q-1)
-    if (min_count is None) or (count < min_count):
-        min_count = count
-        best_es = [e]
-    elif count == min_count:
-        best_es.append(e)
-
-print("最小未加密信息数量:", min_count)
-print("满足条件的 e 数量:", len(best_es))
-print("这些 e 的和:", sum(best_es))
+
+
+def show(result):
+    print("最小未加密信息数量:", result['unconcealed'])
+    print("满足条件的 e 数量:", result['nb_exponents'])
+    print("这些 e 的和:", result['sum'])
+
+
+if __name__ == "__main__":
+    # 按 gcd(e-1, p-1) 和 gcd(e-1, q-1) 分组计数，不用遍历所有 e
+    result = min_unconcealed_exponents(p, q)
+    show(result)
+
+    # 小参数时用暴力遍历核对
+    start = time.perf_counter()
+    assert min_unconcealed_exponents(p, q, brute_force=True) == result
+    print("暴力遍历核对通过 (%.2f 秒)" % (time.perf_counter() - start))
+
+    # 更大的素数也可以直接计算
+    p, q = 18446744073709551557, 18446744073709551533
+    start = time.perf_counter()
+    show(min_unconcealed_exponents(p, q))
+    print("64 位素数用时 %.3f 秒" % (time.perf_counter() - start))
@@ -0,0 +1,614 @@
+#!/usr/bin/python3
+'''benchmarks for libmatasano
+
+usage: python3 bench_libmatasano.py [name ...]
+(without argument, every benchmark is run)
+'''
+
+import os
+import random
+import struct
+import subprocess
+import sys
+import time
+from array import array
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+import libmatasano
+from libmatasano import optional
+
+
+KB = 2 ** 10
+MB = 2 ** 20
+GB = 2 ** 30
+
+
+def _size_str(size):
+    for unit, name in [(GB, 'GB'), (MB, 'MB'), (KB, 'KB')]:
+        if size >= unit:
+            return '%d %s' % (size // unit, name)
+    return '%d B' % size
+
+
+def bench_cbc(max_size=GB):
+    '''streaming CBC: time per byte should stay constant from 1 KB to 1 GB'''
+    key = os.urandom(16)
+    iv = os.urandom(16)
+    # the same chunk is fed again and again
+    # so that memory usage does not depend on the message size
+    chunk = os.urandom(MB)
+    out = bytearray(MB + libmatasano.BLOCK_SIZE)
+
+    print('%10s %12s %12s %12s %12s' % ('size', 'encrypt (s)', 'decrypt (s)',
+                                       'enc MB/s', 'dec MB/s'))
+    size = KB
+    while size <= max_size:
+        piece = chunk[:min(size, MB)]
+        count = size // len(piece)
+
+        start = time.perf_counter()
+        encryptor = libmatasano.AES128CBCEncryptor(iv, key)
+        for _ in range(count):
+            encryptor.update_into(piece, out)
+        encryptor.finalize()
+        enc_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        decryptor = libmatasano.AES128CBCDecryptor(iv, key)
+        for _ in range(count):
+            decryptor.update_into(piece, out)
+        # a random "ciphertext" has random padding
+        try:
+            decryptor.finalize()
+        except libmatasano.PaddingError:
+            pass
+        dec_time = time.perf_counter() - start
+
+        print('%10s %12.4f %12.4f %12.1f %12.1f' % (
+            _size_str(size), enc_time, dec_time,
+            size / MB / enc_time, size / MB / dec_time))
+        size *= 16
+
+
+def bench_ctr(size=64 * MB):
+    '''batched CTR compared to raw AES (ECB on the same amount of data)'''
+    key = os.urandom(16)
+    msg = os.urandom(size)
+
+    encryptor = Cipher(algorithms.AES(key), modes.ECB(),
+                       backend=libmatasano.backend).encryptor()
+    start = time.perf_counter()
+    encryptor.update(msg)
+    raw_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    libmatasano.transform_aes_128_ctr(msg, key, 0)
+    ctr_time = time.perf_counter() - start
+
+    print('%-10s %10.1f MB/s' % ('raw AES', size / MB / raw_time))
+    print('%-10s %10.1f MB/s' % ('CTR', size / MB / ctr_time))
+
+
+def bench_aes_cache(nb_blocks=2 ** 16):
+    '''per-block AES with a new context each time, with cached contexts,
+    and whole-buffer ECB'''
+    key = os.urandom(16)
+    msg = os.urandom(nb_blocks * libmatasano.BLOCK_SIZE)
+    blocks = libmatasano.split_bytes_in_blocks(msg, libmatasano.BLOCK_SIZE)
+
+    def uncached_block(block):
+        cipher = Cipher(algorithms.AES(key), modes.ECB(),
+                        backend=libmatasano.backend)
+        encryptor = cipher.encryptor()
+        return encryptor.update(block) + encryptor.finalize()
+
+    libmatasano.aes_context_cache_clear()
+    timings = []
+    for name, run in [
+        ('per-block', lambda: [uncached_block(b) for b in blocks]),
+        ('cached', lambda: [libmatasano.encrypt_aes_128_block(b, key) for b in blocks]),
+        ('whole ECB', lambda: libmatasano.encrypt_aes_128_ecb(msg, key)),
+    ]:
+        start = time.perf_counter()
+        run()
+        timings.append((name, time.perf_counter() - start))
+
+    for name, duration in timings:
+        print('%-10s %10.1f MB/s' % (name, len(msg) / MB / duration))
+    print(libmatasano.aes_context_cache_info())
+
+
+def bench_bxor(size=16 * MB):
+    '''XOR kernel: big-int and NumPy backends, repeating key, single byte'''
+    a = os.urandom(size)
+    b = os.urandom(size)
+    out = bytearray(size)
+
+    def big_int():
+        optional.USE_NUMPY = False
+        try:
+            libmatasano.bxor(a, b)
+        finally:
+            optional.USE_NUMPY = True
+
+    cases = [
+        ('big-int', big_int),
+        ('default', lambda: libmatasano.bxor(a, b)),
+        ('out=', lambda: libmatasano.bxor(a, b, out=out)),
+        ('repeat key', lambda: libmatasano.bxor(a, b'ICE', repeat=True)),
+        ('single byte', lambda: libmatasano.bxor(a, 0x42)),
+    ]
+    print('NumPy backend:', 'yes' if optional.numpy() is not None else 'no')
+    for name, run in cases:
+        start = time.perf_counter()
+        run()
+        duration = time.perf_counter() - start
+        print('%-12s %10.1f MB/s' % (name, size / MB / duration))
+
+
+def bench_mt19937(count=10 ** 7):
+    '''MT19937 outputs one at a time and in bulk'''
+    from itertools import islice
+
+    for name, run in [
+        ('generator', lambda: sum(1 for _ in islice(libmatasano.MT19937_32(1), count // 10))),
+        ('random_words', lambda: libmatasano.MT19937(1).random_words(count)),
+        ('random_bytes', lambda: libmatasano.MT19937(1).random_bytes(4 * count)),
+    ]:
+        n = count // 10 if name == 'generator' else count
+        start = time.perf_counter()
+        run()
+        duration = time.perf_counter() - start
+        print('%-14s %12.0f words/s' % (name, n / duration))
+
+
+def bench_mt19937_clone(nb_sessions=2000):
+    '''MT19937 cloning from captured sessions of 624 outputs'''
+    sessions = [libmatasano.MT19937(seed).random_words(libmatasano.MT19937.n)
+                for seed in range(nb_sessions)]
+
+    start = time.perf_counter()
+    for outputs in sessions:
+        libmatasano.clone_mt19937(outputs)
+    one_by_one = time.perf_counter() - start
+
+    start = time.perf_counter()
+    libmatasano.clone_mt19937_many(sessions)
+    batch = time.perf_counter() - start
+
+    start = time.perf_counter()
+    words = array('I')
+    for outputs in sessions:
+        words += outputs
+    libmatasano.untemper_words(words)
+    untemper_only = time.perf_counter() - start
+
+    print('%-14s %10.0f clones/s' % ('one by one', nb_sessions / one_by_one))
+    print('%-14s %10.0f clones/s' % ('batch', nb_sessions / batch))
+    print('%-14s %10.0f words/s' % ('untemper', len(words) / untemper_only))
+
+
+def bench_sha1(size=4 * MB):
+    '''pure-Python SHA-1, in one call and incrementally, versus hashlib'''
+    import hashlib
+
+    msg = os.urandom(size)
+
+    def incremental():
+        h = libmatasano.SHA1()
+        for i in range(0, size, 1000):
+            h.update(msg[i:i + 1000])
+        return h.digest()
+
+    for name, run in [
+        ('sha1()', lambda: libmatasano.sha1(msg)),
+        ('SHA1.update', incremental),
+        ('hashlib', lambda: hashlib.sha1(msg).digest()),
+    ]:
+        start = time.perf_counter()
+        run()
+        duration = time.perf_counter() - start
+        print('%-12s %10.2f MB/s' % (name, size / MB / duration))
+
+
+def bench_sha1_length_extension(max_key_length=1024):
+    '''forgeries for every key length, one MAC computation per padded length'''
+    message = os.urandom(100)
+    mac = libmatasano.sha1(os.urandom(16) + message)
+    suffix = b';admin=true' * 10
+    key_lengths = range(max_key_length + 1)
+
+    start = time.perf_counter()
+    for key_length in key_lengths:
+        glue = libmatasano.sha1_padding(key_length + len(message))
+        libmatasano.SHA1(suffix, state=struct.unpack('>5I', mac),
+                         length=key_length + len(message) + len(glue)).digest()
+    one_by_one = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in libmatasano.sha1_length_extension(mac, message, suffix, key_lengths):
+        pass
+    batch = time.perf_counter() - start
+
+    print('%-12s %10.0f forgeries/s' % ('one by one', len(key_lengths) / one_by_one))
+    print('%-12s %10.0f forgeries/s' % ('batch', len(key_lengths) / batch))
+
+
+def bench_single_byte_xor(nb_columns=200):
+    '''single-byte XOR key search per column, by column length
+    (256 candidate plaintexts versus one histogram)'''
+    text = (b"I'm back and I'm ringin' the bell, a rockin' on the mike "
+            b"while the fly girls yell ") * 2000
+
+    def candidates(column):
+        letters = set(libmatasano.ascii_text_chars)
+        return max(range(256), key=lambda k: sum(
+            x in letters for x in libmatasano.bxor(column, k)))
+
+    print('%8s %14s %14s %14s' % ('length', 'candidates', 'letters', 'chi_squared'))
+    for length in [16, 256, 4096, 65536]:
+        columns = [libmatasano.bxor(text[i:i + length], i % 256)
+                   for i in range(nb_columns)]
+        rates = []
+        for run in [
+            candidates,
+            lambda c: libmatasano.rank_single_byte_xor_keys(c, 'letters'),
+            lambda c: libmatasano.rank_single_byte_xor_keys(c, 'chi_squared'),
+        ]:
+            # the candidate version is too slow for the long columns
+            n = 5 if run is candidates and length > 256 else nb_columns
+            start = time.perf_counter()
+            for column in columns[:n]:
+                run(column)
+            rates.append(n / (time.perf_counter() - start))
+        print('%8d %10.0f c/s %10.0f c/s %10.0f c/s' % (length, *rates))
+
+
+def bench_single_byte_xor_detection(nb_lines=200000):
+    '''detection of the single-byte XOR line in a file of hex lines,
+    serial and with one process per CPU'''
+    import tempfile
+
+    workers = os.cpu_count() or 1
+    with tempfile.NamedTemporaryFile(suffix='.txt') as f:
+        lines = [os.urandom(30).hex().encode() for _ in range(nb_lines)]
+        lines[nb_lines // 3] = libmatasano.bxor(b'Now that the party is jumping\n', 0x35).hex().encode()
+        f.write(b'\n'.join(lines))
+        f.flush()
+        for n in sorted({1, workers}):
+            stats = {}
+            best = libmatasano.detect_single_byte_xor(f.name, workers=n, stats=stats)[0]
+            print('%2d workers %10.0f lines/s  (line %d: %r)' % (
+                n, stats['lines_per_second'], best['line'], best['message']))
+
+
+def bench_keysize_estimation(max_keysize=400):
+    '''Hamming-distance keysize estimation over the whole ciphertext,
+    big-int and NumPy backends'''
+    text = (b"I'm back and I'm ringin' the bell, a rockin' on the mike "
+            b"while the fly girls yell ") * 20000
+    keysizes = range(2, max_keysize + 1)
+
+    print('%10s %12s %12s %8s' % ('length', 'big-int (s)', 'NumPy (s)', 'found'))
+    for length in [16 * KB, 256 * KB, MB]:
+        ctxt = libmatasano.bxor(text[:length], os.urandom(97), repeat=True)
+        timings = []
+        for use_numpy in [False, True]:
+            optional.USE_NUMPY = use_numpy
+            start = time.perf_counter()
+            best = libmatasano.estimate_keysizes(ctxt, keysizes, top_k=1)[0]
+            timings.append(time.perf_counter() - start)
+        optional.USE_NUMPY = True
+        print('%10s %12.3f %12.3f %8d' % (_size_str(length), *timings, best['keysize']))
+
+
+def bench_repeating_key_xor(max_keysize=256):
+    '''repeating-key XOR search over every keysize up to max_keysize,
+    by ciphertext length, serial and with one process per CPU'''
+    text = (b"I'm back and I'm ringin' the bell, a rockin' on the mike "
+            b"while the fly girls yell ") * 20000
+    workers = os.cpu_count() or 1
+
+    print('%10s %8s %12s %12s' % ('length', 'keysizes', 'serial (s)',
+                                  '%d workers (s)' % workers))
+    for length in [16 * KB, 256 * KB, MB]:
+        ctxt = libmatasano.bxor(text[:length], os.urandom(97), repeat=True)
+        for keysizes in [range(1, 41), range(1, max_keysize + 1)]:
+            timings = []
+            for n in [1, workers]:
+                start = time.perf_counter()
+                libmatasano.break_repeating_key_xor(ctxt, keysizes, workers=n)
+                timings.append(time.perf_counter() - start)
+            print('%10s %8d %12.3f %12.3f' % (_size_str(length), len(keysizes), *timings))
+
+
+def bench_many_time_pad(nb_ciphertexts=10000, length=2 * KB):
+    '''many-time pad: counting the ciphertexts (in batches) and solving the key'''
+    words = (b"the quick brown fox jumps over a lazy dog while "
+             b"people ask about weather and money ").split()
+    rng = random.Random(1)
+    keystream = os.urandom(length)
+    plaintexts = [b' '.join(rng.choice(words) for _ in range(length // 4))[:length]
+                  for _ in range(nb_ciphertexts)]
+    ciphertexts = [libmatasano.bxor(p, keystream, longest=False) for p in plaintexts]
+
+    pad = libmatasano.ManyTimePad()
+    start = time.perf_counter()
+    for i in range(0, nb_ciphertexts, 1000):
+        pad.add(ciphertexts[i:i + 1000])
+    add_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    key, confidence = pad.key()
+    key_time = time.perf_counter() - start
+
+    correct = sum(k == s for (k, s) in zip(key, keystream))
+    print('%d ciphertexts of %s' % (nb_ciphertexts, _size_str(length)))
+    print('%-8s %8.3f s (%.1f MB/s)' % ('add', add_time,
+                                       nb_ciphertexts * length / MB / add_time))
+    print('%-8s %8.3f s (%d/%d key bytes right)' % ('key', key_time, correct, length))
+
+
+def bench_byte_at_a_time_ecb(target_size=1000):
+    '''byte-at-a-time ECB decryption: oracle queries and time,
+    one query per candidate byte versus one query per target byte'''
+    key = os.urandom(16)
+    prefix = os.urandom(37)
+    target = os.urandom(target_size)
+    queries = 0
+
+    def encrypt(message):
+        nonlocal queries
+        queries += 1
+        return libmatasano.encrypt_aes_128_ecb(prefix + message + target, key)
+
+    def one_query_per_candidate(layout):
+        block_size = layout['block_size']
+        r = layout['prefix_size']
+        known = b''
+        for k in range(layout['target_size']):
+            padding = b'X' * ((-k - 1 - r) % block_size)
+            block = (k + r + len(padding)) // block_size * block_size
+            target_block = encrypt(padding)[block:block + block_size]
+            for i in range(256):
+                if encrypt(padding + known + bytes([i]))[block:block + block_size] == target_block:
+                    known += bytes([i])
+                    break
+        return known
+
+    layout = libmatasano.ecb_oracle_layout(encrypt)
+    for name, run in [
+        ('per candidate', lambda: one_query_per_candidate(layout)),
+        ('per byte', lambda: libmatasano.byte_at_a_time_ecb(encrypt, layout)['target']),
+    ]:
+        queries = 0
+        start = time.perf_counter()
+        assert run() == target
+        duration = time.perf_counter() - start
+        print('%-14s %8d queries %8.3f s' % (name, queries, duration))
+
+
+def bench_remote_oracle(nb_queries=2000, latency=0.002):
+    '''oracle served over TCP with a latency per query: one query at a time,
+    pipelined batches on one and on several connections, cached answers,
+    and byte-at-a-time ECB through the network'''
+    key = os.urandom(16)
+    prefix = os.urandom(37)
+    target = os.urandom(200)
+
+    def encrypt(message):
+        return libmatasano.encrypt_aes_128_ecb(prefix + message + target, key)
+
+    messages = [os.urandom(16) for _ in range(nb_queries)]
+    expected = [encrypt(m) for m in messages]
+    with libmatasano.OracleServer({'encrypt': encrypt}, latency=latency) as server:
+        print('%d queries, %.1f ms of latency per query' % (nb_queries, latency * 1e3))
+        remote = libmatasano.RemoteOracle(server.address, 'encrypt', connections=1)
+        parallel = libmatasano.RemoteOracle(server.address, 'encrypt', connections=4)
+        cached = libmatasano.InstrumentedOracle(parallel)
+        cached.map(messages)
+        for name, run in [
+            ('one at a time', lambda: [remote(m) for m in messages]),
+            ('pipelined', lambda: remote.map(messages)),
+            ('4 connections', lambda: parallel.map(messages)),
+            ('cached', lambda: cached.map(messages)),
+        ]:
+            start = time.perf_counter()
+            assert run() == expected
+            duration = time.perf_counter() - start
+            print('%-14s %8.3f s %10.0f queries/s' % (name, duration, nb_queries / duration))
+
+        instrumented = libmatasano.InstrumentedOracle(remote)
+        start = time.perf_counter()
+        result = libmatasano.byte_at_a_time_ecb(instrumented)
+        duration = time.perf_counter() - start
+        assert result['target'] == target
+        stats = instrumented.stats()
+        print('byte-at-a-time ECB: %d queries in %.3f s, mean latency %.2f ms' % (
+            stats['queries'], duration, stats['mean_latency'] * 1e3))
+        print('latency histogram:', ', '.join(
+            '<%d us: %d' % item for item in stats['latency_histogram'].items()))
+        remote.close()
+
+
+def bench_padding_oracle(size=MB, remote_size=4 * KB, latency=0.001):
+    '''CBC padding oracle attack on english text: a local oracle answering
+    batches with a latency per call, and an oracle behind the TCP stand-in
+    with a latency per query'''
+    text = open(__file__, 'rb').read()
+    message = (text * (size // len(text) + 1))[:size]
+    oracle = libmatasano.CBCPaddingOracle(latency=latency)
+    print('%-8s %10s %10s %14s %12s %12s' % ('oracle', 'size', 'time (s)', 'queries/byte',
+                                            'round trips', 'queries/s'))
+
+    def run(name, ctxt, target):
+        start = time.perf_counter()
+        result = libmatasano.attack_padding_oracle(ctxt, target)
+        duration = time.perf_counter() - start
+        assert result['plaintext'] == oracle.decrypt(ctxt)
+        print('%-8s %10s %10.2f %14.1f %12d %12.0f' % (
+            name, _size_str(len(ctxt) - 16), duration,
+            result['queries'] / len(result['queries_per_byte']),
+            result['round_trips'], result['queries'] / duration))
+
+    run('local', oracle.encrypt(message), oracle)
+    local = libmatasano.CBCPaddingOracle(oracle.key)
+    with libmatasano.OracleServer({'padding': local}, latency=latency) as server:
+        with libmatasano.RemoteOracle(server.address, 'padding') as remote:
+            run('remote', oracle.encrypt(message[:remote_size]), remote)
+
+
+def bench_password_search(length=4):
+    '''SHA-1 preimage search over lowercase letters and digits (a full
+    keyspace, the target is never found): one hashlib call per candidate,
+    prefix midstates, and prefix midstates with one process per CPU'''
+    import hashlib
+    from itertools import product
+
+    charset = b'abcdefghijklmnopqrstuvwxyz0123456789'
+    target = bytes(20)
+    size = libmatasano.keyspace_size(len(charset), [length], repeat=True)
+    workers = os.cpu_count() or 1
+
+    def naive():
+        for candidate in product(charset, repeat=length):
+            if hashlib.sha1(bytes(candidate)).digest() == target:
+                return candidate
+
+    for name, run in [
+        ('naive', naive),
+        ('midstates', lambda: libmatasano.search_sha1_preimage(
+            target, charset, [length], repeat=True)),
+        ('%d workers' % workers, lambda: libmatasano.search_sha1_preimage(
+            target, charset, [length], repeat=True, workers=workers)),
+    ]:
+        start = time.perf_counter()
+        run()
+        duration = time.perf_counter() - start
+        print('%-12s %12.0f candidates/s' % (name, size / duration))
+
+
+def bench_bac_search(years=2):
+    '''BAC key search over birth dates and an expiry month (the key is never
+    found): AES check of the first block with and without NumPy, and with
+    one process per CPU'''
+    import datetime
+
+    ciphertext = os.urandom(32)
+    births = list(libmatasano.mrz_dates(datetime.date(1970, 1, 1),
+                                        datetime.date(1970 + years, 1, 1)))
+    size = len(births) * 100
+    workers = os.cpu_count() or 1
+    use_numpy = optional.USE_NUMPY
+
+    def search(numpy, workers=1):
+        optional.USE_NUMPY = numpy
+        try:
+            assert libmatasano.search_bac_key(ciphertext, 'L898902C<3', births, '9406??' + '?',
+                                              workers=workers) is None
+        finally:
+            optional.USE_NUMPY = use_numpy
+
+    for name, run in [
+        ('pure-python', lambda: search(False)),
+        ('numpy', lambda: search(True)),
+        ('%d workers' % workers, lambda: search(True, workers)),
+    ]:
+        if name != 'pure-python' and optional.numpy() is None:
+            continue
+        start = time.perf_counter()
+        run()
+        duration = time.perf_counter() - start
+        print('%-12s %12.0f candidates/s' % (name, size / duration))
+
+
+def bench_ecb_detection(nb_records=20000, record_size=160):
+    '''ECB detection over a corpus of records, all alignment offsets'''
+    records = [os.urandom(record_size) for _ in range(nb_records)]
+    for name, block_sizes, all_offsets in [
+        ('aligned 16', (16,), False),
+        ('offsets 16', (16,), True),
+        ('offsets 8,16', (8, 16), True),
+    ]:
+        start = time.perf_counter()
+        libmatasano.detect_ecb(iter(records), block_sizes, all_offsets)
+        duration = time.perf_counter() - start
+        print('%-14s %10.0f records/s' % (name, nb_records / duration))
+
+
+# import time budgets in microseconds
+# (cumulative time of the modules imported, from python -X importtime)
+STARTUP_BUDGETS = {
+    'import libmatasano': 5000,
+    'from libmatasano import bxor, split_bytes_in_blocks': 15000,
+    'from libmatasano import sha1, MT19937_32': 15000,
+}
+
+
+def _import_times(statement):
+    '''{module: cumulative import time in us} for top-level imports'''
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            capture_output=True, text=True, check=True)
+    times = dict()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # nested imports are indented, their time is in their parent's
+        if cumulative.strip().isdigit() and not name.startswith('  '):
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def bench_startup(runs=5):
+    '''import time of libmatasano, checked against STARTUP_BUDGETS'''
+    # modules imported by the interpreter itself are not counted
+    baseline = set(_import_times('pass'))
+    within_budget = True
+    for statement, budget in STARTUP_BUDGETS.items():
+        totals = []
+        for _ in range(runs):
+            times = _import_times(statement)
+            totals.append(sum(t for name, t in times.items() if name not in baseline))
+        total = sorted(totals)[runs // 2]
+        ok = total <= budget
+        within_budget = within_budget and ok
+        print('%-55s %8d us (budget %d us) %s' % (statement, total, budget,
+                                                  'OK' if ok else 'OVER BUDGET'))
+    return within_budget
+
+
+BENCHMARKS = {
+    'cbc': bench_cbc,
+    'ctr': bench_ctr,
+    'aes_cache': bench_aes_cache,
+    'bxor': bench_bxor,
+    'mt19937': bench_mt19937,
+    'mt19937_clone': bench_mt19937_clone,
+    'sha1': bench_sha1,
+    'sha1_length_extension': bench_sha1_length_extension,
+    'single_byte_xor': bench_single_byte_xor,
+    'single_byte_xor_detection': bench_single_byte_xor_detection,
+    'keysize_estimation': bench_keysize_estimation,
+    'repeating_key_xor': bench_repeating_key_xor,
+    'many_time_pad': bench_many_time_pad,
+    'byte_at_a_time_ecb': bench_byte_at_a_time_ecb,
+    'remote_oracle': bench_remote_oracle,
+    'padding_oracle': bench_padding_oracle,
+    'password_search': bench_password_search,
+    'bac_search': bench_bac_search,
+    'ecb_detection': bench_ecb_detection,
+    'startup': bench_startup,
+}
+
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(BENCHMARKS)
+    failed = False
+    for name in names:
+        print('==', name)
+        # a benchmark with a budget returns False when it is exceeded
+        if BENCHMARKS[name]() is False:
+            failed = True
+    sys.exit(1 if failed else 0)
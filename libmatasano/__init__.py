@@ -0,0 +1,74 @@
+'''library for the cryptopals ("matasano") challenges
+
+The submodules are only imported when one of their names is first used,
+so "from libmatasano import bxor" does not import the cryptography
+backend, IPython or NumPy.
+'''
+
+import importlib
+
+# submodule -> names it exports at the package level
+_EXPORTS = {
+    'aes': [
+        'backend',
+        'aes_128_ecb_encryptor', 'aes_128_ecb_decryptor',
+        'aes_context_cache_info', 'aes_context_cache_clear',
+        'encrypt_aes_128_block', 'decrypt_aes_128_block',
+        'encrypt_aes_128_ecb', 'decrypt_aes_128_ecb',
+        'aes_128_ctr_keystream', 'aes_128_ctr_keystream_generator',
+        'transform_aes_128_ctr',
+        'AES128CBCEncryptor', 'AES128CBCDecryptor',
+        'encrypt_aes_128_cbc', 'decrypt_aes_128_cbc',
+        'cbc_xor',
+    ],
+    'attacks': [
+        'ascii_text_chars', 'ENGLISH_FREQ_ORDER', 'ENGLISH_FREQUENCIES', 'SCORINGS',
+        'byte_weights', 'byte_histogram',
+        'single_byte_xor_scores', 'rank_single_byte_xor_keys',
+        'attack_single_byte_xor', 'detect_single_byte_xor',
+        'estimate_keysizes', 'break_repeating_key_xor',
+    ],
+    'bac': ['DES_PARITY', 'adjust_parity', 'mrz_check_digit', 'bac_keys',
+            'mrz_dates', 'printable_block', 'search_bac_key'],
+    'blocks': ['BLOCK_SIZE', 'split_bytes_in_blocks'],
+    'display': ['html_test'],
+    'ecb': ['count_repeated_blocks', 'ecb_score', 'test_ecb_128',
+            'read_hex_records', 'detect_ecb',
+            'ecb_oracle_layout', 'byte_at_a_time_ecb'],
+    'many_time_pad': ['ManyTimePad'],
+    'mt19937': [
+        'MT19937', 'MT19937_32',
+        'untemper', 'untemper_words',
+        'clone_mt19937', 'clone_mt19937_from_bytes', 'clone_mt19937_many',
+    ],
+    'oracle': ['OracleError', 'InstrumentedOracle', 'OracleServer', 'RemoteOracle'],
+    'password': ['keyspace_size', 'search_sha1_preimage'],
+    'padding': ['PaddingError', 'pkcs7_padding', 'pkcs7_strip'],
+    'padding_oracle': ['CBCPaddingOracle', 'attack_padding_oracle',
+                       'attack_padding_oracle_async'],
+    'primes': ['SMALL_PRIMES', 'is_probable_prime', 'factorize'],
+    'rsa': ['unconcealed_messages', 'unconcealed_classes', 'min_unconcealed_exponents'],
+    'sha': ['SHA1', 'sha1', 'sha1_padding',
+            'sha1_length_extension', 'forge_sha1_mac'],
+    'xor': ['bxor', 'hamming_distance'],
+}
+
+_SUBMODULE_OF = {name: module
+                 for module, names in _EXPORTS.items()
+                 for name in names}
+
+__all__ = sorted(_SUBMODULE_OF)
+
+
+def __getattr__(name):
+    if name not in _SUBMODULE_OF:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    module = importlib.import_module('.' + _SUBMODULE_OF[name], __name__)
+    value = getattr(module, name)
+    # next time the name will be found without calling __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,322 @@
+'''AES-128 in ECB, CTR and CBC modes, CBC bit flipping'''
+
+import sys
+import threading
+from array import array
+from functools import lru_cache
+from math import ceil
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.backends import default_backend
+
+from .blocks import BLOCK_SIZE
+from .padding import PaddingError, pkcs7_padding, pkcs7_strip
+from .xor import bxor
+
+backend = default_backend()
+
+
+# AES contexts cache
+
+# setting up the key schedule costs much more than encrypting one block,
+# so the encryptor/decryptor contexts are kept for the most recent keys.
+# in ECB mode a context has no state between two "update" calls
+# as long as we only give it full blocks.
+# contexts are not shared between threads
+# (hence the thread identifier in the arguments)
+AES_CONTEXT_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=AES_CONTEXT_CACHE_SIZE)
+def _aes_128_ecb_context(key, decrypt, thread_id):
+    cipher = Cipher(algorithms.AES(key), modes.ECB(), backend=backend)
+    return cipher.decryptor() if decrypt else cipher.encryptor()
+
+
+def aes_128_ecb_encryptor(key):
+    return _aes_128_ecb_context(bytes(key), False, threading.get_ident())
+
+
+def aes_128_ecb_decryptor(key):
+    return _aes_128_ecb_context(bytes(key), True, threading.get_ident())
+
+
+# hits and misses counters, see functools.lru_cache
+aes_context_cache_info = _aes_128_ecb_context.cache_info
+aes_context_cache_clear = _aes_128_ecb_context.cache_clear
+
+
+def _check_full_blocks(data):
+    # a cached context would keep an incomplete block for the next call
+    if len(data) % BLOCK_SIZE != 0:
+        raise ValueError('data length must be a multiple of %d' % BLOCK_SIZE)
+
+
+# AES one-block
+
+def encrypt_aes_128_block(msg, key):
+    _check_full_blocks(msg)
+    return aes_128_ecb_encryptor(key).update(msg)
+
+
+def decrypt_aes_128_block(ctxt, key):
+    _check_full_blocks(ctxt)
+    return aes_128_ecb_decryptor(key).update(ctxt)
+
+
+# AES ECB (with padding)
+# the whole message is given to the AES backend at once
+
+def encrypt_aes_128_ecb(msg, key):
+    block_size = 16
+    padded_msg = pkcs7_padding(msg, block_size)
+    return aes_128_ecb_encryptor(key).update(padded_msg)
+
+
+def decrypt_aes_128_ecb(ctxt, key):
+    block_size = 16
+    _check_full_blocks(ctxt)
+    padded_msg = aes_128_ecb_decryptor(key).update(ctxt)
+    return pkcs7_strip(padded_msg, block_size)
+
+
+# AES CTR (no padding required)
+
+# number of counter blocks encrypted with a single call to the AES backend
+CTR_BATCH_BLOCKS = 2 ** 14
+
+
+def aes_128_ctr_keystream(key, nonce, nb_blocks, counter=0, encryptor=None):
+    '''keystream for "nb_blocks" consecutive counter blocks starting at "counter"'''
+    # a counter block is the nonce followed by the counter,
+    # both as 8-byte little-endian integers,
+    # so we build all the blocks at once as an array of 64-bit integers
+    # where even positions hold the nonce and odd positions the counter
+    blocks = array('Q', [nonce]) * (2 * nb_blocks)
+    blocks[1::2] = array('Q', range(counter, counter + nb_blocks))
+    if sys.byteorder == 'big':
+        blocks.byteswap()
+
+    if encryptor is None:
+        encryptor = aes_128_ecb_encryptor(key)
+    return encryptor.update(blocks.tobytes())
+
+
+def aes_128_ctr_keystream_generator(key, nonce):
+    encryptor = aes_128_ecb_encryptor(key)
+    counter = 0
+    while True:
+        # equivalent to "for byte in keystream: yield byte"
+        # for the "yield" keyword in Python,
+        # see https://docs.python.org/3/tutorial/classes.html#generators
+        yield from aes_128_ctr_keystream(key, nonce, CTR_BATCH_BLOCKS,
+                                         counter, encryptor)
+
+        counter += CTR_BATCH_BLOCKS
+
+
+def transform_aes_128_ctr(msg, key, nonce):
+    '''does both encryption (msg is plaintext)
+    and decryption (msg is ciphertext)'''
+
+    encryptor = aes_128_ecb_encryptor(key)
+    msg = memoryview(msg).cast('B')
+    result = bytearray(len(msg))
+    batch_size = CTR_BATCH_BLOCKS * BLOCK_SIZE
+    for i in range(0, len(msg), batch_size):
+        chunk = msg[i:i + batch_size]
+        nb_blocks = ceil(len(chunk) / BLOCK_SIZE)
+        keystream = aes_128_ctr_keystream(key, nonce, nb_blocks,
+                                          i // BLOCK_SIZE, encryptor)
+        # XOR of the whole chunk at once, directly into the result
+        # (the end of the last keystream block is ignored)
+        bxor(chunk, keystream, longest=False,
+             out=memoryview(result)[i:i + len(chunk)])
+    return bytes(result)
+
+
+# AES CBC (with padding)
+
+# streaming CBC: the whole message never has to be in memory,
+# only the chaining block (the "mask") and an incomplete block
+# are kept between two calls to update()
+
+# how much data we give to the AES backend (and to big-int XOR) at once
+CBC_CHUNK_SIZE = 2 ** 16
+
+
+class _AES128CBCStream:
+    # number of full blocks that update() must keep for finalize()
+    _held_blocks = 0
+
+    def __init__(self, iv, key):
+        if len(iv) != BLOCK_SIZE:
+            raise ValueError('iv must be %d bytes long' % BLOCK_SIZE)
+        self._key = key
+        self._mask = bytes(iv)
+        self._buffer = bytearray()
+        self._finalized = False
+
+    def _output_size(self, data_length):
+        total = len(self._buffer) + data_length
+        available = max(total - self._held_blocks * BLOCK_SIZE, 0)
+        return available - available % BLOCK_SIZE
+
+    def update(self, data):
+        out = bytearray(self._output_size(len(data)))
+        self.update_into(data, out)
+        return bytes(out)
+
+    def update_into(self, data, out):
+        '''processes data and writes the result into the "out" buffer,
+        returns the number of bytes written'''
+        if self._finalized:
+            raise ValueError('stream already finalized')
+
+        data = memoryview(data).cast('B')
+        out = memoryview(out).cast('B')
+        size = self._output_size(len(data))
+        if len(out) < size:
+            raise ValueError('output buffer too small (%d < %d)'
+                             % (len(out), size))
+        if size == 0:
+            self._buffer += data
+            return 0
+
+        # starting with the bytes left over by the previous calls
+        # (for the decryptor it may include a full block we held back)
+        written = 0
+        start = 0
+        if self._buffer:
+            head_length = min(size, -(-len(self._buffer) // BLOCK_SIZE) * BLOCK_SIZE)
+            start = max(head_length - len(self._buffer), 0)
+            self._buffer += data[:start]
+            head = bytes(self._buffer[:head_length])
+            del self._buffer[:head_length]
+            self._process(memoryview(head), out[:head_length])
+            written = head_length
+
+        # then all the full blocks we can process directly from "data"
+        end = start + size - written
+        for i in range(start, end, CBC_CHUNK_SIZE):
+            j = min(i + CBC_CHUNK_SIZE, end)
+            self._process(data[i:j], out[written:written + j - i])
+            written += j - i
+
+        self._buffer += data[end:]
+        return written
+
+    def process_file(self, src, dst, chunk_size=CBC_CHUNK_SIZE * 16):
+        '''reads "src" and writes the result to "dst" (binary file objects)
+        chunk by chunk, then finalizes'''
+        in_buf = bytearray(chunk_size)
+        out_buf = bytearray(chunk_size + BLOCK_SIZE)
+        in_view = memoryview(in_buf)
+        out_view = memoryview(out_buf)
+        while True:
+            length = src.readinto(in_buf)
+            if not length:
+                break
+            written = self.update_into(in_view[:length], out_buf)
+            dst.write(out_view[:written])
+        dst.write(self.finalize())
+
+
+class AES128CBCEncryptor(_AES128CBCStream):
+    '''streaming AES-128 CBC encryption, PKCS#7 padding added at finalize'''
+
+    def __init__(self, iv, key):
+        super().__init__(iv, key)
+        self._encryptor = aes_128_ecb_encryptor(key)
+
+    def _process(self, blocks, out):
+        # each block of ciphertext is the mask of the next plaintext block
+        # so encryption cannot be done on several blocks at once
+        # (the XOR is inlined on integers: calling bxor for every
+        # 16-byte block would cost more than the XOR itself)
+        encrypt = self._encryptor.update
+        mask = int.from_bytes(self._mask, byteorder='big')
+        for i in range(0, len(blocks), BLOCK_SIZE):
+            tmp = int.from_bytes(blocks[i:i + BLOCK_SIZE], byteorder='big') ^ mask
+            enc_block = encrypt(tmp.to_bytes(BLOCK_SIZE, byteorder='big'))
+            out[i:i + BLOCK_SIZE] = enc_block
+            mask = int.from_bytes(enc_block, byteorder='big')
+        self._mask = mask.to_bytes(BLOCK_SIZE, byteorder='big')
+
+    def finalize(self):
+        if self._finalized:
+            raise ValueError('stream already finalized')
+        padded = pkcs7_padding(bytes(self._buffer), BLOCK_SIZE)
+        out = bytearray(len(padded))
+        self._process(memoryview(padded), memoryview(out))
+        self._buffer = bytearray()
+        self._finalized = True
+        return bytes(out)
+
+
+class AES128CBCDecryptor(_AES128CBCStream):
+    '''streaming AES-128 CBC decryption, PKCS#7 padding removed at finalize'''
+
+    # the last block contains the padding
+    # so we don't output it before we know it is the last one
+    _held_blocks = 1
+
+    def __init__(self, iv, key):
+        super().__init__(iv, key)
+        self._decryptor = aes_128_ecb_decryptor(key)
+
+    def _process(self, blocks, out):
+        # unlike encryption, all the masks are known in advance
+        # so we decrypt and XOR all the blocks at once
+        decrypted = self._decryptor.update(blocks)
+        bxor(decrypted, self._mask + blocks[:-BLOCK_SIZE], out=out)
+        self._mask = bytes(blocks[-BLOCK_SIZE:])
+
+    def finalize(self):
+        if self._finalized:
+            raise ValueError('stream already finalized')
+        if len(self._buffer) != BLOCK_SIZE:
+            raise PaddingError('ciphertext length is not a positive '
+                               'multiple of the block size')
+        out = bytearray(BLOCK_SIZE)
+        self._process(memoryview(self._buffer), memoryview(out))
+        self._buffer = bytearray()
+        self._finalized = True
+        return pkcs7_strip(bytes(out), BLOCK_SIZE)
+
+
+def encrypt_aes_128_cbc(msg, iv, key):
+    encryptor = AES128CBCEncryptor(iv, key)
+    return encryptor.update(msg) + encryptor.finalize()
+
+
+def decrypt_aes_128_cbc(ctxt, iv, key):
+    decryptor = AES128CBCDecryptor(iv, key)
+    return decryptor.update(ctxt) + decryptor.finalize()
+
+
+# bit flipping on CBC ciphertexts
+
+def cbc_xor(cryptogram, pad, index):
+    ctxt = cryptogram['ctxt']
+    iv = cryptogram['iv']
+
+    if len(pad) > BLOCK_SIZE - (index % BLOCK_SIZE):
+        raise ValueError('pad cannot cover several blocks')
+
+    if isinstance(index, tuple):
+        # allowing negative block number and in-block index
+        block_nb = index[0] % (len(ctxt) // BLOCK_SIZE)
+        index_in_block = index[1] % (BLOCK_SIZE)
+
+        index = block_nb * BLOCK_SIZE + index_in_block
+    else:
+        # allowing negative bit index
+        index = index % len(ctxt)
+
+    if index < BLOCK_SIZE:
+        iv = bxor(iv, (b'\x00' * index) + pad)
+    else:
+        ctxt = bxor(ctxt, b'\x00' * (index - BLOCK_SIZE) + pad)
+
+    return {'ctxt': ctxt, 'iv': iv}
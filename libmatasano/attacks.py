@@ -0,0 +1,509 @@
+'''attacks on XOR ciphers'''
+
+import binascii
+import heapq
+import time
+from collections import Counter, deque
+from functools import lru_cache
+
+from . import optional
+from .xor import NUMPY_XOR_MIN_SIZE, bxor
+
+
+# bytes representing lowercase english letters and space
+ascii_text_chars = list(range(97, 122)) + [32]
+
+# english letters from the most frequent to the least frequent
+ENGLISH_FREQ_ORDER = b' etaoinshrdlcumwfgypbvkjxqz'
+
+# frequency of letters (case insensitive) and space in english text
+# (without punctuation, see OTHER_FREQUENCY)
+ENGLISH_FREQUENCIES = {
+    b' ': 0.1918,
+    b'e': 0.1041, b't': 0.0729, b'a': 0.0651, b'o': 0.0596, b'n': 0.0564,
+    b'i': 0.0558, b's': 0.0515, b'r': 0.0497, b'h': 0.0493, b'd': 0.0350,
+    b'l': 0.0331, b'u': 0.0225, b'c': 0.0217, b'm': 0.0202, b'f': 0.0198,
+    b'w': 0.0171, b'g': 0.0158, b'y': 0.0146, b'p': 0.0137, b'b': 0.0129,
+    b'v': 0.0083, b'k': 0.0057, b'x': 0.0014, b'j': 0.0009, b'q': 0.0008,
+    b'z': 0.0006,
+}
+
+# share of the other bytes (punctuation, digits, newlines ...) for chi-squared
+OTHER_FREQUENCY = 0.05
+
+# from this length on, NumPy counts the bytes faster than a Counter
+NUMPY_HISTOGRAM_MIN_SIZE = 2 ** 12
+
+# with fewer distinct ciphertext bytes than this,
+# scoring in pure Python is faster than building the NumPy matrices
+NUMPY_SCORING_MIN_DISTINCT = 16
+
+
+def byte_weights(score_function):
+    '''the table of the 256 scores of single bytes,
+    for a score function that adds up a score for each byte of a text'''
+    return [score_function(bytes([b])) for b in range(256)]
+
+
+def _letters_weights():
+    return [int(b in ascii_text_chars) for b in range(256)]
+
+
+def _frequency_rank_weights():
+    weights = [0] * 256
+    for rank, b in enumerate(ENGLISH_FREQ_ORDER):
+        weights[b] = weights[bytes([b]).upper()[0]] = len(ENGLISH_FREQ_ORDER) - rank
+    return weights
+
+
+# linear scorings: the score of a text is the sum of the weights of its bytes
+SCORINGS = {
+    'letters': _letters_weights(),
+    'frequency_rank': _frequency_rank_weights(),
+}
+
+
+def _chi_squared_categories():
+    # category of each byte: one per letter (case insensitive),
+    # one for space and a last one for everything else
+    letters = list(ENGLISH_FREQUENCIES)
+    other = len(letters)
+    categories = [other] * 256
+    for i, letter in enumerate(letters):
+        categories[letter[0]] = categories[letter.upper()[0]] = i
+    total = sum(ENGLISH_FREQUENCIES.values())
+    frequencies = [f * (1 - OTHER_FREQUENCY) / total for f in ENGLISH_FREQUENCIES.values()]
+    frequencies.append(OTHER_FREQUENCY)
+    return categories, frequencies
+
+
+_CATEGORIES, _CATEGORY_FREQUENCIES = _chi_squared_categories()
+
+
+def byte_histogram(data):
+    '''{byte value: number of occurences} for the bytes present in data'''
+    view = memoryview(data).cast('B')
+    numpy = optional.numpy() if len(view) >= NUMPY_HISTOGRAM_MIN_SIZE else None
+    if numpy is not None:
+        counts = numpy.bincount(numpy.frombuffer(view, dtype=numpy.uint8), minlength=256)
+        return Counter({b: int(counts[b]) for b in numpy.flatnonzero(counts).tolist()})
+    return Counter(view)
+
+
+@lru_cache(maxsize=None)
+def _numpy_tables():
+    numpy = optional.numpy()
+    x = numpy.arange(256)
+    # xor_table[k, p] is the ciphertext byte giving plaintext byte p with key k
+    xor_table = x[:, None] ^ x[None, :]
+    one_hot = numpy.zeros((256, len(_CATEGORY_FREQUENCIES)))
+    one_hot[x, _CATEGORIES] = 1
+    return xor_table, one_hot
+
+
+def _scores_numpy(numpy, histogram, scoring, length):
+    counts = numpy.zeros(256, dtype=numpy.int64)
+    counts[list(histogram)] = list(histogram.values())
+    xor_table, one_hot = _numpy_tables()
+    # plaintext histograms for every key, as a 256x256 matrix
+    plaintext_counts = counts[xor_table]
+    if scoring == 'chi_squared':
+        observed = plaintext_counts @ one_hot
+        expected = length * numpy.array(_CATEGORY_FREQUENCIES)
+        return (-((observed - expected) ** 2 / expected).sum(axis=1)).tolist()
+    return (plaintext_counts @ numpy.array(scoring)).tolist()
+
+
+def _scores_python(histogram, scoring, length):
+    items = list(histogram.items())
+    if scoring == 'chi_squared':
+        expected = [length * f for f in _CATEGORY_FREQUENCIES]
+        scores = []
+        for k in range(256):
+            observed = [0] * len(expected)
+            for b, count in items:
+                observed[_CATEGORIES[b ^ k]] += count
+            scores.append(-sum((o - e) ** 2 / e for (o, e) in zip(observed, expected)))
+        return scores
+    return [sum(count * scoring[b ^ k] for b, count in items) for k in range(256)]
+
+
+def _linear_weights(scoring):
+    # None for the non-linear chi-squared scoring
+    if isinstance(scoring, str):
+        return None if scoring == 'chi_squared' else SCORINGS[scoring]
+    return scoring
+
+
+def _scores_from_histogram(histogram, scoring):
+    weights = _linear_weights(scoring)
+    scoring = 'chi_squared' if weights is None else weights
+    length = sum(histogram.values())
+
+    numpy = (optional.numpy() if len(histogram) >= NUMPY_SCORING_MIN_DISTINCT
+             else None)
+    if numpy is not None:
+        return _scores_numpy(numpy, histogram, scoring, length)
+    return _scores_python(histogram, scoring, length)
+
+
+def single_byte_xor_scores(ciphertext, scoring='letters', forbidden=None):
+    '''score of each of the 256 single-byte keys (higher is better)
+
+    scoring: 'letters', 'frequency_rank' (see SCORINGS), 'chi_squared'
+             (the score is minus the chi-squared statistic)
+             or a table of 256 weights (see byte_weights).
+    forbidden: plaintext bytes that cannot appear,
+               the score of keys producing one of them is None.
+
+    The ciphertext is only read once to build its histogram,
+    the cost of the scoring does not depend on its length.
+    '''
+    histogram = byte_histogram(ciphertext)
+    scores = _scores_from_histogram(histogram, scoring)
+
+    if forbidden:
+        forbidden = set(forbidden)
+        # only the distinct bytes of the ciphertext have to be checked
+        for k in range(256):
+            if any(b ^ k in forbidden for b in histogram):
+                scores[k] = None
+    return scores
+
+
+def rank_single_byte_xor_keys(ciphertext, scoring='letters', top_k=1, forbidden=None):
+    '''the "top_k" best single-byte keys, as a list of dicts
+    with keys "key" (an integer) and "score", best first
+    (see single_byte_xor_scores for the arguments)'''
+    scores = single_byte_xor_scores(ciphertext, scoring, forbidden)
+    keys = [k for k in range(256) if scores[k] is not None]
+    # nlargest is stable: on ties the smallest key comes first
+    best = heapq.nlargest(top_k, keys, key=scores.__getitem__)
+    return [{'key': k, 'score': scores[k]} for k in best]
+
+
+# from challenge 3
+def attack_single_byte_xor(ciphertext):
+    best = rank_single_byte_xor_keys(ciphertext, 'letters')[0]
+    return {
+        'message': bxor(ciphertext, best['key']),
+        'nb_letters': best['score'],
+        'key': best['key'].to_bytes(1, byteorder='big'),
+    }
+
+
+# from challenge 6
+
+# data is read by chunks of (about) this size
+# when counting bytes per column with NumPy
+REPEATING_KEY_CHUNK_SIZE = 2 ** 20
+
+
+def _column_counts_numpy(numpy, data, keysize):
+    # counts[i, b]: occurences of byte b in column i (bytes i, i+keysize ...)
+    counts = numpy.zeros(keysize * 256, dtype=numpy.int64)
+    rows = min(max(1, REPEATING_KEY_CHUNK_SIZE // keysize), -(-len(data) // keysize))
+    chunk_size = max(1, rows) * keysize
+    columns = numpy.arange(chunk_size) % keysize * 256
+    for start in range(0, len(data), chunk_size):
+        chunk = numpy.frombuffer(data, dtype=numpy.uint8,
+                                 count=min(chunk_size, len(data) - start), offset=start)
+        counts += numpy.bincount(columns[:len(chunk)] + chunk, minlength=keysize * 256)
+    return counts.reshape(keysize, 256)
+
+
+def _best_keys_numpy(numpy, counts, weights):
+    # best key and its score for each row of byte counts (one row per ciphertext):
+    # table[b, k] = weights[b ^ k], one matrix product scores all the rows
+    # (in floating point, so that it runs on BLAS)
+    xor_table, _ = _numpy_tables()
+    table = numpy.array(weights, dtype=float)[xor_table]
+    scores = counts.astype(float) @ table
+    keys = scores.argmax(axis=1)
+    return keys, scores[numpy.arange(len(keys)), keys]
+
+
+def _break_keysize(data, keysize, scoring):
+    weights = _linear_weights(scoring)
+    numpy = optional.numpy()
+    if numpy is not None and weights is not None:
+        counts = _column_counts_numpy(numpy, data, keysize)
+        key, scores = _best_keys_numpy(numpy, counts, weights)
+        return {'keysize': keysize, 'key': bytes(key.tolist()),
+                'score': scores.sum().item()}
+
+    key = bytearray()
+    plaintext_histogram = Counter()
+    for i in range(keysize):
+        histogram = byte_histogram(data[i::keysize])
+        scores = _scores_from_histogram(histogram, scoring)
+        k = max(range(256), key=scores.__getitem__)
+        key.append(k)
+        for b, count in histogram.items():
+            plaintext_histogram[b ^ k] += count
+    score = _scores_from_histogram(plaintext_histogram, scoring)[0]
+    return {'keysize': keysize, 'key': bytes(key), 'score': score}
+
+
+# ciphertext of the worker processes, sent once when the pool starts
+_worker_data = None
+
+
+def _set_worker_data(data):
+    global _worker_data
+    _worker_data = data
+
+
+def _break_keysize_worker(keysize, scoring):
+    return _break_keysize(_worker_data, keysize, scoring)
+
+
+def _break_keysizes(data, keysizes, scoring, workers):
+    # results in the order of the keysizes
+    if workers == 1:
+        for keysize in keysizes:
+            yield _break_keysize(data, keysize, scoring)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_set_worker_data,
+                                   initargs=(data,))
+    try:
+        futures = [executor.submit(_break_keysize_worker, keysize, scoring)
+                   for keysize in keysizes]
+        for future in futures:
+            yield future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+@lru_cache(maxsize=None)
+def _popcount_table():
+    numpy = optional.numpy()
+    return numpy.array([bin(x).count('1') for x in range(256)], dtype=numpy.uint8)
+
+
+def _shifted_distances_numpy(numpy, data, keysizes):
+    array = numpy.frombuffer(data, dtype=numpy.uint8)
+    # numpy.bitwise_count is only in NumPy 2
+    popcount = getattr(numpy, 'bitwise_count', None) or _popcount_table().__getitem__
+    for keysize in keysizes:
+        xored = array[:-keysize] ^ array[keysize:]
+        yield int(popcount(xored).sum(dtype='int64'))
+
+
+def _shifted_distances_python(data, keysizes):
+    # with little-endian ordering, shifting the whole ciphertext as an integer
+    # by "keysize" bytes puts each byte in front of the byte "keysize" positions later
+    x = int.from_bytes(data, byteorder='little')
+    for keysize in keysizes:
+        # the last "keysize" bytes are xored with zeroes and must not count
+        yield ((x ^ (x >> (8 * keysize))).bit_count()
+               - int.from_bytes(data[-keysize:], byteorder='little').bit_count())
+
+
+def estimate_keysizes(ciphertext, keysizes=range(2, 41), top_k=None):
+    '''likeliest keysizes for repeating-key XOR, as a list of dicts
+    with keys "keysize", "distance" and "confidence", most likely first.
+
+    The distance is the Hamming distance between every block and the next one
+    (at every alignment) over the whole ciphertext, in bits per byte;
+    it is lower for the right keysize (and its multiples) because the key cancels out.
+    The confidence is how many standard deviations the distance
+    is below the average of the keysizes tried.
+    The result can be given as is to break_repeating_key_xor.'''
+    data = bytes(ciphertext)
+    # at least two blocks
+    keysizes = [k for k in keysizes if 0 < k <= len(data) // 2]
+    if not keysizes:
+        return []
+
+    numpy = optional.numpy() if len(data) >= NUMPY_XOR_MIN_SIZE else None
+    if numpy is not None:
+        distances = _shifted_distances_numpy(numpy, data, keysizes)
+    else:
+        distances = _shifted_distances_python(data, keysizes)
+    distances = [(distance / (len(data) - keysize), keysize)
+                 for (distance, keysize) in zip(distances, keysizes)]
+
+    mean = sum(d for (d, _) in distances) / len(distances)
+    deviation = (sum((d - mean) ** 2 for (d, _) in distances) / len(distances)) ** 0.5
+    ranked = sorted(distances)[:top_k]
+    return [{'keysize': keysize, 'distance': distance,
+             'confidence': (mean - distance) / deviation if deviation else 0.0}
+            for (distance, keysize) in ranked]
+
+
+def break_repeating_key_xor(ciphertext, keysizes, scoring='frequency_rank', top_k=1,
+                            workers=1, stop_margin=None):
+    '''the "top_k" best keys for repeating-key XOR, one per keysize,
+    as a list of dicts with keys "keysize", "key" and "score", best first.
+
+    Each column of the ciphertext is solved as a single-byte XOR
+    (see single_byte_xor_scores for "scoring"), the score of a keysize is
+    the score of the whole plaintext it gives so scores can be compared.
+    Plaintexts are not kept, decrypt the one you want with
+    bxor(ciphertext, key, repeat=True).
+
+    keysizes: integers or the result of estimate_keysizes.
+    workers: number of processes solving keysizes in parallel.
+    stop_margin: stop as soon as the best keysize is ahead of all the others
+                 by this score per byte of ciphertext
+                 (try the most likely keysizes first,
+                 keep in mind that multiples of the keysize score as well).
+    '''
+    data = bytes(ciphertext)
+    # candidates from estimate_keysizes
+    keysizes = [k['keysize'] if isinstance(k, dict) else k for k in keysizes]
+    # min-heap of the best candidates, smallest keysize first on ties
+    heap = []
+    first = second = None
+    results = _break_keysizes(data, keysizes, scoring, workers)
+    try:
+        for result in results:
+            item = (result['score'], -result['keysize'], result['key'])
+            if len(heap) < top_k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+            score = result['score']
+            if first is None or score > first:
+                first, second = score, first
+            elif second is None or score > second:
+                second = score
+            if (stop_margin is not None and second is not None
+                    and first - second >= stop_margin * len(data)):
+                break
+    finally:
+        results.close()
+    return [{'keysize': -keysize, 'key': key, 'score': score}
+            for (score, keysize, key) in sorted(heap, reverse=True)]
+
+
+# from challenge 4
+
+# bytes removed from the lines before decoding them
+_NOT_HEX = bytes(b for b in range(256) if b not in b'0123456789abcdefABCDEF')
+
+
+def _hex_line_batches(file, batch_lines, chunk_size):
+    # (number of the first line, lines) from a binary file read by chunks,
+    # so that the file never has to fit in memory
+    if isinstance(file, str):
+        with open(file, 'rb') as f:
+            yield from _hex_line_batches(f, batch_lines, chunk_size)
+        return
+    first_line = 1
+    batch = []
+    rest = b''
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            break
+        lines = (rest + chunk).split(b'\n')
+        rest = lines.pop()
+        for line in lines:
+            batch.append(line)
+            if len(batch) == batch_lines:
+                yield first_line, batch
+                first_line += len(batch)
+                batch = []
+    if rest:
+        batch.append(rest)
+    if batch:
+        yield first_line, batch
+
+
+def _detect_lines(first_line, lines, scoring, top_k):
+    # top_k records (score, -line number, key, ciphertext) of a batch
+    numbers = []
+    ciphertexts = []
+    for number, line in enumerate(lines, start=first_line):
+        line = line.translate(None, _NOT_HEX)
+        if not line:
+            continue
+        try:
+            ciphertexts.append(binascii.unhexlify(line))
+        except binascii.Error:
+            # odd number of digits
+            continue
+        numbers.append(number)
+
+    weights = _linear_weights(scoring)
+    numpy = optional.numpy()
+    if numpy is not None and weights is not None and ciphertexts:
+        # byte counts of all the lines at once: counts[i, b] for line i
+        lengths = [len(c) for c in ciphertexts]
+        data = numpy.frombuffer(b''.join(ciphertexts), dtype=numpy.uint8)
+        rows = numpy.repeat(numpy.arange(len(ciphertexts)) * 256, lengths)
+        counts = numpy.bincount(rows + data, minlength=256 * len(ciphertexts))
+        keys, scores = _best_keys_numpy(numpy, counts.reshape(-1, 256), weights)
+        keys, scores = keys.tolist(), scores.tolist()
+    else:
+        best = [rank_single_byte_xor_keys(c, scoring)[0] for c in ciphertexts]
+        keys = [b['key'] for b in best]
+        scores = [b['score'] for b in best]
+
+    records = zip(scores, [-n for n in numbers], keys, ciphertexts)
+    # line numbers are unique, records are never compared beyond them
+    return heapq.nlargest(top_k, records)
+
+
+def _merge_records(heap, records, top_k):
+    for record in records:
+        if len(heap) < top_k:
+            heapq.heappush(heap, record)
+        elif record > heap[0]:
+            heapq.heapreplace(heap, record)
+
+
+def detect_single_byte_xor(file, scoring='letters', top_k=10, workers=1,
+                           batch_lines=2 ** 14, chunk_size=2 ** 22, stats=None):
+    '''the "top_k" lines of a file of hex lines most likely to be
+    single-byte XOR encrypted, as a list of dicts with keys
+    "line" (starting at 1), "key", "score" and "message", best first.
+
+    file: a path or a binary file, read by chunks of "chunk_size" bytes.
+    Characters that are not hex digits are ignored,
+    lines with an odd number of digits are skipped.
+    scoring: see single_byte_xor_scores.
+    workers: number of processes, each one gets batches of "batch_lines" lines.
+    stats: if given, a dict where "lines", "seconds" and "lines_per_second"
+           are stored.
+    '''
+    start = time.perf_counter()
+    batches = _hex_line_batches(file, batch_lines, chunk_size)
+    heap = []
+    nb_lines = 0
+
+    if workers == 1:
+        for first_line, lines in batches:
+            _merge_records(heap, _detect_lines(first_line, lines, scoring, top_k), top_k)
+            nb_lines += len(lines)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            # only a few batches are in flight so that memory use stays bounded
+            pending = deque()
+            for first_line, lines in batches:
+                pending.append(executor.submit(_detect_lines, first_line, lines,
+                                               scoring, top_k))
+                nb_lines += len(lines)
+                if len(pending) >= 2 * workers:
+                    _merge_records(heap, pending.popleft().result(), top_k)
+            while pending:
+                _merge_records(heap, pending.popleft().result(), top_k)
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    if stats is not None:
+        seconds = time.perf_counter() - start
+        stats.update(lines=nb_lines, seconds=seconds,
+                     lines_per_second=nb_lines / seconds if seconds else 0.0)
+    return [{'line': -minus_line, 'key': key, 'score': score,
+             'message': bxor(ctxt, key)}
+            for (score, minus_line, key, ctxt) in sorted(heap, reverse=True)]
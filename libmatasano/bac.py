@@ -0,0 +1,358 @@
+'''BAC key derivation from the MRZ of a passport, and a search of the key
+when parts of the MRZ are unknown (MysteryTwister "ePassport" challenge, 2.2.1.py)
+
+The MRZ information is the document number, the birth date and the expiry
+date, each followed by its check digit. The key seed is the first 16 bytes
+of its SHA-1, and SHA-1(seed + counter) gives ka and kb (8 bytes each)
+whose bytes get a DES parity bit. The key is ka + kb.
+'''
+
+import hashlib
+import time
+from collections import deque
+from datetime import timedelta
+from functools import lru_cache
+
+from . import optional
+from .blocks import BLOCK_SIZE
+
+
+def _parity_table():
+    # the 7 high bits are kept, the low bit makes the number of 1 bits odd
+    return bytes((b & 0xFE) | (bin(b >> 1).count('1') + 1) % 2 for b in range(256))
+
+
+# DES_PARITY[b]: b with its low bit set for odd parity
+DES_PARITY = _parity_table()
+
+
+def adjust_parity(key):
+    '''key (bytes) with the DES parity bit of each byte set'''
+    return bytes(key).translate(DES_PARITY)
+
+
+_CHECK_WEIGHTS = (7, 3, 1)
+
+
+def _char_value(c):
+    if c.isdigit():
+        return int(c)
+    if c == '<':
+        return 0
+    return ord(c.upper()) - ord('A') + 10
+
+
+def mrz_check_digit(field):
+    '''ICAO 9303 check digit (as a string) of an MRZ field'''
+    return str(sum(_char_value(c) * _CHECK_WEIGHTS[i % 3]
+                   for i, c in enumerate(field)) % 10)
+
+
+def _counter_bytes(counter):
+    return counter.to_bytes(4, byteorder='big')
+
+
+def _keys_from_seeds(seeds, counter):
+    # all the keys at once: one join and one translation for the parity bits
+    suffix = _counter_bytes(counter)
+    sha1 = hashlib.sha1
+    return b''.join([sha1(seed + suffix).digest()[:16] for seed in seeds]).translate(DES_PARITY)
+
+
+def bac_keys(mrz_informations, counter=1):
+    '''keys (ka + kb, 16 bytes each) of a list of MRZ informations
+    (str or bytes: document number, birth date and expiry date with their
+    check digits); counter 1 gives the encryption key, 2 the MAC key'''
+    seeds = [hashlib.sha1(m.encode() if isinstance(m, str) else m).digest()[:16]
+             for m in mrz_informations]
+    keys = _keys_from_seeds(seeds, counter)
+    return [keys[i:i + 16] for i in range(0, len(keys), 16)]
+
+
+# candidate fields
+
+def mrz_dates(start, end):
+    '''field specifications (see search_bac_key) of the dates from start
+    to end (datetime.date, included), check digit to compute'''
+    date = start
+    while date <= end:
+        yield date.strftime('%y%m%d') + '?'
+        date += timedelta(days=1)
+
+
+def _expand_field(spec, verify_check_digit):
+    # every value of a field specification, with its check digit
+    body, check = spec[:-1], spec[-1]
+    unknown = [i for i, c in enumerate(body) if c == '?']
+    values = []
+    for n in range(10 ** len(unknown)):
+        chars = list(body)
+        for i, position in enumerate(reversed(unknown)):
+            n, digit = divmod(n, 10)
+            chars[position] = str(digit)
+        field = ''.join(chars)
+        digit = mrz_check_digit(field)
+        if check == '?' or not verify_check_digit or check == digit:
+            values.append((field + (digit if check == '?' else check)).encode())
+    return values
+
+
+def _expand_fields(specs, verify_check_digit):
+    if isinstance(specs, str):
+        specs = [specs]
+    values = []
+    for spec in specs:
+        values.extend(_expand_field(spec, verify_check_digit))
+    return values
+
+
+# first block decryption with many keys
+
+@lru_cache(maxsize=None)
+def _aes_tables():
+    # S-box (from the multiplicative inverse and the affine map), inverse
+    # S-box, and the tables of the equivalent inverse cipher: td[r][x] is the
+    # column (a little-endian word, row 0 in the low byte) that byte x
+    # of row r gives after InvSubBytes and InvMixColumns, tm[r] the same
+    # without InvSubBytes (for the round keys)
+    numpy = optional.numpy()
+
+    def rotl8(x, shift):
+        return ((x << shift) | (x >> (8 - shift))) & 0xFF
+
+    sbox = [0] * 256
+    p = q = 1
+    while True:
+        # p times 3, q divided by 3: q is the inverse of p
+        p = (p ^ (p << 1) ^ (0x1B if p & 0x80 else 0)) & 0xFF
+        q ^= q << 1
+        q ^= q << 2
+        q ^= q << 4
+        q &= 0xFF
+        if q & 0x80:
+            q ^= 0x09
+        sbox[p] = q ^ rotl8(q, 1) ^ rotl8(q, 2) ^ rotl8(q, 3) ^ rotl8(q, 4) ^ 0x63
+        if p == 1:
+            break
+    sbox[0] = 0x63
+    inv_sbox = [0] * 256
+    for i, s in enumerate(sbox):
+        inv_sbox[s] = i
+
+    def mul(x, c):
+        result = 0
+        while c:
+            if c & 1:
+                result ^= x
+            x = ((x << 1) ^ (0x1B if x & 0x80 else 0)) & 0xFF
+            c >>= 1
+        return result
+
+    def column_tables(values):
+        # row r of the InvMixColumns matrix column is rotated down by r
+        coefficients = (14, 9, 13, 11)
+        tables = []
+        for r in range(4):
+            rotated = coefficients[-r:] + coefficients[:-r] if r else coefficients
+            tables.append(numpy.array(
+                [sum(mul(v, c) << (8 * row) for row, c in enumerate(rotated)) for v in values],
+                dtype='<u4'))
+        return tables
+
+    return (numpy.array(sbox, dtype=numpy.uint8), numpy.array(inv_sbox, dtype=numpy.uint8),
+            column_tables(inv_sbox), column_tables(range(256)))
+
+
+_RCON = [0x01, 0x02, 0x04, 0x08, 0x10, 0x20, 0x40, 0x80, 0x1B, 0x36]
+
+
+def _decrypt_block_numpy(numpy, keys, block):
+    # AES-128 decryption of one block under each key (rows of keys),
+    # all the keys at the same time, with the equivalent inverse cipher.
+    # words[i] is word i of the key schedule of every key (one row per word
+    # so that each step works on contiguous memory)
+    sbox, inv_sbox, td, tm = _aes_tables()
+    n = len(keys)
+    words = numpy.empty((44, n), dtype='<u4')
+    words[:4] = numpy.ascontiguousarray(keys).view('<u4').T
+    as_bytes = words.view(numpy.uint8).reshape(44, n, 4)
+    sbox = sbox.astype('<u4')
+    for i in range(4, 44):
+        temp = words[i - 1]
+        if i % 4 == 0:
+            # RotWord, SubWord and the round constant
+            b = as_bytes[i - 1]
+            temp = (sbox[b[:, 1]] ^ (sbox[b[:, 2]] << 8) ^ (sbox[b[:, 3]] << 16)
+                    ^ (sbox[b[:, 0]] << 24) ^ _RCON[i // 4 - 1])
+        words[i] = words[i - 4] ^ temp
+    # round keys 1 to 9 through InvMixColumns
+    middle = as_bytes[4:40]
+    decryption_keys = (tm[0][middle[..., 0]] ^ tm[1][middle[..., 1]]
+                       ^ tm[2][middle[..., 2]] ^ tm[3][middle[..., 3]])
+
+    block = numpy.frombuffer(block, dtype='<u4')
+    state = [words[40 + c] ^ block[c] for c in range(4)]
+    for r in range(9, 0, -1):
+        columns = [column.view(numpy.uint8).reshape(n, 4) for column in state]
+        # row r of column c comes from column c - r (InvShiftRows)
+        state = [td[0][columns[c][:, 0]] ^ td[1][columns[c - 1][:, 1]]
+                 ^ td[2][columns[c - 2][:, 2]] ^ td[3][columns[c - 3][:, 3]]
+                 ^ decryption_keys[4 * (r - 1) + c]
+                 for c in range(4)]
+    columns = [column.view(numpy.uint8).reshape(n, 4) for column in state]
+    plain = numpy.empty((n, 16), dtype=numpy.uint8)
+    for c in range(4):
+        for row in range(4):
+            plain[:, 4 * c + row] = inv_sbox[columns[c - row][:, row]]
+    return plain ^ as_bytes[:4].transpose(1, 0, 2).reshape(n, 16)
+
+
+def _printable_table():
+    table = [False] * 256
+    for b in list(range(32, 127)) + [9, 10, 13]:
+        table[b] = True
+    return table
+
+
+_PRINTABLE = _printable_table()
+
+
+def printable_block(block):
+    '''default plausibility test: only printable ASCII'''
+    return all(_PRINTABLE[b] for b in block)
+
+
+def _plausible_indexes(keys, block, previous, plausible):
+    # indexes of the keys decrypting block (after XOR with previous) to a plausible block
+    numpy = optional.numpy()
+    if numpy is not None:
+        plain = _decrypt_block_numpy(numpy, numpy.frombuffer(keys, dtype=numpy.uint8)
+                                     .reshape(-1, 16), block)
+        plain ^= numpy.frombuffer(previous, dtype=numpy.uint8)
+        if plausible is printable_block:
+            ok = numpy.array(_PRINTABLE)[plain].all(axis=1)
+            return numpy.flatnonzero(ok).tolist()
+        return [i for i, row in enumerate(plain) if plausible(row.tobytes())]
+
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+    from .xor import bxor
+
+    ecb = modes.ECB()
+    found = []
+    for i in range(0, len(keys), 16):
+        decryptor = Cipher(algorithms.AES(keys[i:i + 16]), ecb).decryptor()
+        if plausible(bxor(decryptor.update(block), previous)):
+            found.append(i // 16)
+    return found
+
+
+def _search_range(fields, block, previous, plausible, counter, start, stop):
+    # index of the first plausible candidate in [start, stop), or None
+    documents, births, expiries = fields
+    per_document = len(births) * len(expiries)
+    seeds = []
+    index = start
+    while index < stop:
+        d, rest = divmod(index, per_document)
+        b, e = divmod(rest, len(expiries))
+        # the hash state after the document number and birth date is shared
+        state = hashlib.sha1(documents[d] + births[b])
+        copy = state.copy
+        end = min(len(expiries), e + stop - index)
+        for expiry in expiries[e:end]:
+            h = copy()
+            h.update(expiry)
+            seeds.append(h.digest()[:16])
+        index += end - e
+    found = _plausible_indexes(_keys_from_seeds(seeds, counter), block, previous, plausible)
+    return start + found[0] if found else None
+
+
+# fields of the worker processes, sent once when the pool starts
+_worker_fields = None
+
+
+def _set_worker_fields(fields):
+    global _worker_fields
+    _worker_fields = fields
+
+
+def _search_range_worker(*args):
+    return _search_range(_worker_fields, *args)
+
+
+def search_bac_key(ciphertext, document_number, birth_date, expiry_date, iv=bytes(16),
+                   plausible=printable_block, counter=1, verify_check_digits=True,
+                   workers=1, chunk_size=2 ** 15, progress=None):
+    '''first MRZ information (in enumeration order) whose key decrypts
+    the first CBC block of ciphertext to a plausible block,
+    as a dict with keys "mrz_information", "key" and "index", or None.
+
+    document_number, birth_date, expiry_date: field specifications
+        (or lists of them): the field and its check digit, with "?" for
+        unknown digits, for instance "12345678<8", "1110182", "1111??" + "?";
+        a "?" check digit is computed, a known one is checked against the
+        field (unless verify_check_digits is False). See mrz_dates for ranges.
+    plausible: function of a decrypted block (bytes) telling whether it
+        looks right, printable ASCII by default (tested on all the keys of
+        a chunk at once). Must be picklable if workers > 1.
+    workers: number of processes, each one gets ranges of "chunk_size" candidates.
+    progress: function called after each range with a dict with keys
+        "done", "total", "seconds" and "rate" (candidates per second).
+    '''
+    fields = (_expand_fields(document_number, verify_check_digits),
+              _expand_fields(birth_date, verify_check_digits),
+              _expand_fields(expiry_date, verify_check_digits))
+    total = len(fields[0]) * len(fields[1]) * len(fields[2])
+    block, previous = ciphertext[:BLOCK_SIZE], iv
+    tasks = [(start, min(total, start + chunk_size)) for start in range(0, total, chunk_size)]
+
+    start_time = time.perf_counter()
+    done = 0
+
+    def range_done(task, found):
+        nonlocal done
+        done += (task[1] if found is None else found + 1) - task[0]
+        if progress is not None:
+            seconds = time.perf_counter() - start_time
+            progress({'done': done, 'total': total, 'seconds': seconds,
+                      'rate': done / seconds if seconds else 0.0})
+        if found is None:
+            return None
+        per_document = len(fields[1]) * len(fields[2])
+        d, rest = divmod(found, per_document)
+        b, e = divmod(rest, len(fields[2]))
+        mrz_information = (fields[0][d] + fields[1][b] + fields[2][e]).decode()
+        return {'mrz_information': mrz_information,
+                'key': bac_keys([mrz_information], counter)[0],
+                'index': found}
+
+    result = None
+    if workers == 1:
+        for task in tasks:
+            result = range_done(task, _search_range(fields, block, previous, plausible,
+                                                    counter, *task))
+            if result is not None:
+                break
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_set_worker_fields,
+                                       initargs=(fields,))
+        try:
+            # a bounded number of ranges in flight, oldest first
+            pending = deque()
+            for task in tasks:
+                pending.append((task, executor.submit(_search_range_worker, block, previous,
+                                                      plausible, counter, *task)))
+                if len(pending) >= 2 * workers:
+                    task, future = pending.popleft()
+                    result = range_done(task, future.result())
+                    if result is not None:
+                        break
+            while result is None and pending:
+                task, future = pending.popleft()
+                result = range_done(task, future.result())
+        finally:
+            executor.shutdown(cancel_futures=True)
+    return result
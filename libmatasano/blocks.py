@@ -0,0 +1,11 @@
+'''splitting messages in blocks'''
+
+from math import ceil
+
+# block size seems to be 16 bytes (128 bits) all along the challenges
+BLOCK_SIZE = 16
+
+
+def split_bytes_in_blocks(x, blocksize):
+    nb_blocks = ceil(len(x) / blocksize)
+    return [x[blocksize * i:blocksize * (i + 1)] for i in range(nb_blocks)]
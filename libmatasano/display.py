@@ -0,0 +1,34 @@
+'''displaying test results in a Jupyter notebook'''
+
+# IPython is only imported when html_test is called,
+# so the rest of the library works on hosts without it
+
+_HTML_INFO_STYLE = ('border:1px solid #c3e6cb;'
+                    'padding:.75rem 3rem;'
+                    'border-radius:.5rem;'
+                    'font-weight:bold;'
+                    'text-align: center;'
+                    )
+
+
+def html_test(condition):
+    import IPython.display
+
+    if condition:
+        html = IPython.display.HTML(
+            '<div style="' +
+            _HTML_INFO_STYLE +
+            'background-color:#d4edda;'
+            'color:#155724;'
+            'border-color:#c3e6cb;'
+            '">OK</div>')
+    else:
+        html = IPython.display.HTML(
+            '<div style="' +
+            _HTML_INFO_STYLE +
+            'background-color:#f8d7da;'
+            'color:#721c24;'
+            'border-color:#f5c6cb;'
+            '">ERROR</div>')
+
+    IPython.display.display(html)
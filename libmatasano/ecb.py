@@ -0,0 +1,214 @@
+'''detection of ECB-encrypted ciphertexts (challenges 8 and 11)
+and byte-at-a-time decryption (challenges 12 and 14)
+
+in ECB mode equal plaintext blocks give equal ciphertext blocks,
+so repeated blocks in a ciphertext are a strong hint of ECB.
+'''
+
+import heapq
+
+from . import optional
+from .blocks import BLOCK_SIZE
+
+# from this number of blocks on,
+# sorting with NumPy is faster than a set of Python objects
+NUMPY_ECB_MIN_BLOCKS = 64
+
+
+def count_repeated_blocks(ctxt, block_size=BLOCK_SIZE, offset=0):
+    '''number of blocks equal to a previous block,
+    blocks of "block_size" bytes starting at "offset"'''
+    nb_blocks = (len(ctxt) - offset) // block_size
+    if nb_blocks < 2:
+        return 0
+
+    numpy = optional.numpy() if nb_blocks >= NUMPY_ECB_MIN_BLOCKS else None
+    if numpy is not None:
+        # each block is seen as a single fixed-width value, without copy
+        blocks = numpy.frombuffer(ctxt, dtype=numpy.uint8,
+                                  count=nb_blocks * block_size, offset=offset)
+        blocks = blocks.view(numpy.dtype((numpy.void, block_size)))
+        return nb_blocks - len(numpy.unique(blocks))
+
+    # slices of a read-only memoryview are hashable and don't copy the data
+    view = memoryview(ctxt).cast('B')
+    if not view.readonly:
+        view = memoryview(bytes(view))
+    distinct = set(view[i:i + block_size]
+                   for i in range(offset, offset + nb_blocks * block_size, block_size))
+    return nb_blocks - len(distinct)
+
+
+def ecb_score(ctxt, block_sizes=(BLOCK_SIZE,), all_offsets=True):
+    '''best repetition count over the block sizes and alignment offsets,
+    as a dict with keys "repeats", "block_size" and "offset"'''
+    best = {'repeats': 0, 'block_size': block_sizes[0], 'offset': 0}
+    for block_size in block_sizes:
+        # blocks may not be aligned on the start of the record
+        # (for instance with an unknown header before the ciphertext)
+        for offset in (range(block_size) if all_offsets else [0]):
+            repeats = count_repeated_blocks(ctxt, block_size, offset)
+            if repeats > best['repeats']:
+                best = {'repeats': repeats, 'block_size': block_size, 'offset': offset}
+    return best
+
+
+# Challenge 8 and Challenge 11
+def test_ecb_128(ctxt):
+    """test wether ctxt is a ECB mode ciphertext"""
+    return count_repeated_blocks(ctxt, 16) > 0
+
+
+def read_hex_records(file):
+    '''one record per non-empty line of hex, file is a path or a text file
+    (lines are read one at a time)'''
+    if isinstance(file, str):
+        with open(file) as f:
+            yield from read_hex_records(f)
+        return
+    for line in file:
+        line = line.strip()
+        if line:
+            yield bytes.fromhex(line)
+
+
+def detect_ecb(records, block_sizes=(BLOCK_SIZE,), all_offsets=True, top_k=10):
+    '''the "top_k" records with the most repeated blocks.
+
+    records is an iterable of ciphertexts (consumed one at a time)
+    or the path of a file with one hex record per line.
+    Returns a list of dicts (see ecb_score) with the record "index" added,
+    most repeated first; records without any repetition are ignored.'''
+    if isinstance(records, str):
+        records = read_hex_records(records)
+
+    # min-heap of the best suspects so far
+    # (the index is there to break ties without comparing dicts)
+    heap = []
+    for index, ctxt in enumerate(records):
+        score = ecb_score(ctxt, block_sizes, all_offsets)
+        if score['repeats'] == 0:
+            continue
+        score['index'] = index
+        item = (score['repeats'], -index, score)
+        if len(heap) < top_k:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+    return [score for (_, _, score) in sorted(heap, reverse=True)]
+
+
+class _CountingOracle:
+    # an encryption oracle that counts the queries made to it
+    def __init__(self, encrypt):
+        self.encrypt = encrypt
+        self.queries = 0
+
+    def __call__(self, message):
+        self.queries += 1
+        return self.encrypt(message)
+
+
+def _first_different_block(a, b, block_size):
+    for i in range(0, min(len(a), len(b)), block_size):
+        if a[i:i + block_size] != b[i:i + block_size]:
+            return i // block_size
+    return min(len(a), len(b)) // block_size
+
+
+def ecb_oracle_layout(encrypt, max_block_size=64):
+    '''block size, size of the unknown prefix and size of the unknown target
+    of an oracle returning ECB(prefix + message + target),
+    as a dict with keys "block_size", "prefix_size", "target_size" and "queries".
+
+    The prefix can be of any length (including several blocks)
+    and contain anything, it never has to be compared with our own bytes.
+    '''
+    oracle = _CountingOracle(encrypt)
+
+    # the ciphertext grows by one block when prefix + message + target
+    # reaches a multiple of the block size
+    empty_length = len(oracle(b''))
+    for i in range(1, max_block_size + 1):
+        length = len(oracle(b'A' * i))
+        if length != empty_length:
+            block_size = length - empty_length
+            aligned_size = i
+            break
+    else:
+        raise ValueError('did not detect any change in ciphertext length')
+
+    # the first block changing with the first byte of the message
+    # is the block where the message starts
+    block = _first_different_block(oracle(b'A'), oracle(b'B'), block_size)
+
+    # smallest n such that changing message[n] does not change this block anymore,
+    # (found by dichotomy) then the message starts block_size - n bytes before
+    # the end of the block
+    low, high = 1, block_size
+    while low < high:
+        n = (low + high) // 2
+        x = oracle(b'A' * n + b'B')[block * block_size:(block + 1) * block_size]
+        y = oracle(b'A' * n + b'C')[block * block_size:(block + 1) * block_size]
+        if x == y:
+            high = n
+        else:
+            low = n + 1
+    prefix_size = block * block_size + block_size - low
+
+    return {
+        'block_size': block_size,
+        'prefix_size': prefix_size,
+        'target_size': empty_length - aligned_size - prefix_size,
+        'queries': oracle.queries,
+    }
+
+
+def byte_at_a_time_ecb(encrypt, layout=None):
+    '''decrypts the unknown target of an oracle returning
+    ECB(prefix + message + target) with one oracle query per byte.
+
+    Each query holds the 256 candidates for the next byte
+    (the last known bytes followed by each possible byte, one block each)
+    and the padding putting the next target byte at the end of a block,
+    so the ciphertext block of the target can be looked up directly.
+
+    Returns a dict with keys "target", "block_size", "prefix_size",
+    "layout_queries" (queries made by ecb_oracle_layout)
+    and "queries_per_byte".
+    '''
+    if layout is None:
+        layout = ecb_oracle_layout(encrypt)
+    block_size = layout['block_size']
+    prefix_size = layout['prefix_size']
+    oracle = _CountingOracle(encrypt)
+
+    # the candidates start on a block boundary
+    align = b'A' * (-prefix_size % block_size)
+    candidates_start = prefix_size + len(align)
+    candidates_end = candidates_start + 256 * block_size
+
+    known = b''
+    queries_per_byte = []
+    for k in range(layout['target_size']):
+        queries = oracle.queries
+        padding = b'A' * ((-k - 1) % block_size)
+        # the block_size - 1 bytes before target byte k
+        window = (b'A' * block_size + padding + known)[-(block_size - 1):]
+        message = align + b''.join(window + bytes([c]) for c in range(256)) + padding
+        ctxt = oracle(message)
+
+        dictionary = {ctxt[i:i + block_size]: c
+                      for (c, i) in enumerate(range(candidates_start, candidates_end,
+                                                    block_size))}
+        target_block = (candidates_end + len(padding) + k) // block_size * block_size
+        known += bytes([dictionary[ctxt[target_block:target_block + block_size]]])
+        queries_per_byte.append(oracle.queries - queries)
+
+    return {
+        'target': known,
+        'block_size': block_size,
+        'prefix_size': prefix_size,
+        'layout_queries': layout['queries'],
+        'queries_per_byte': queries_per_byte,
+    }
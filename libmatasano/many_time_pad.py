@@ -0,0 +1,147 @@
+'''many-time pad: ciphertexts encrypted with the same keystream
+(stream cipher with a reused key or nonce, challenges 19 and 20)
+
+XORing two ciphertexts cancels the key and gives the XOR of the plaintexts.
+The XOR of a space with a letter is a letter with the other case,
+so a ciphertext byte whose XOR with the bytes of the other ciphertexts
+(at the same position) is always a letter or zero is likely a space,
+which gives the key byte at that position.
+'''
+
+from collections import Counter
+from functools import lru_cache
+
+from . import optional
+from .xor import bxor
+
+SPACE = ord(' ')
+
+# ciphertexts are counted by batches of about this number of bytes
+MANY_TIME_PAD_BATCH_SIZE = 2 ** 22
+
+# XOR of a space with one of these bytes is a letter or a space
+_SPACE_PARTNERS = frozenset(
+    [0] + list(range(ord('a'), ord('z') + 1)) + list(range(ord('A'), ord('Z') + 1)))
+
+
+@lru_cache(maxsize=None)
+def _partners_table():
+    # table[b, v] = 1 if b ^ v is a letter or zero
+    numpy = optional.numpy()
+    x = numpy.arange(256)
+    partners = numpy.zeros(256)
+    partners[list(_SPACE_PARTNERS)] = 1
+    return partners[x[:, None] ^ x[None, :]]
+
+
+class ManyTimePad:
+    '''ciphertexts sharing the same keystream,
+    more ciphertexts can be added at any time (see add).
+
+    Only the byte counts of each position are kept
+    (and the ciphertexts themselves, for decryption)
+    so adding ciphertexts does not recompute anything about the previous ones.
+    '''
+
+    def __init__(self, ciphertexts=()):
+        self.ciphertexts = []
+        self._numpy = optional.numpy()
+        # counts[j][b]: number of ciphertexts with byte b at position j
+        if self._numpy is not None:
+            self._counts = self._numpy.zeros((0, 256), dtype=self._numpy.int64)
+        else:
+            self._counts = []
+        self._key = None
+        self.add(ciphertexts)
+
+    def __len__(self):
+        return len(self.ciphertexts)
+
+    def add(self, ciphertexts):
+        '''add a batch of ciphertexts (an iterable of bytes)'''
+        ciphertexts = [bytes(c) for c in ciphertexts]
+        if not ciphertexts:
+            return
+        self.ciphertexts.extend(ciphertexts)
+        self._key = None
+        length = max(len(c) for c in ciphertexts)
+
+        if self._numpy is None:
+            while len(self._counts) < length:
+                self._counts.append(Counter())
+            for c in ciphertexts:
+                for j, b in enumerate(c):
+                    self._counts[j][b] += 1
+            return
+
+        numpy = self._numpy
+        if len(self._counts) < length:
+            self._counts = numpy.vstack([
+                self._counts,
+                numpy.zeros((length - len(self._counts), 256), dtype=numpy.int64)])
+        # a few MB of the batch at a time
+        rows = max(1, MANY_TIME_PAD_BATCH_SIZE // max(length, 1))
+        for i in range(0, len(ciphertexts), rows):
+            self._add_numpy(ciphertexts[i:i + rows])
+
+    def _add_numpy(self, ciphertexts):
+        numpy = self._numpy
+        length = max(len(c) for c in ciphertexts)
+        # the batch as a padded matrix, the mask tells which bytes are real
+        lengths = numpy.array([len(c) for c in ciphertexts])
+        matrix = numpy.zeros((len(ciphertexts), length), dtype=numpy.uint8)
+        mask = numpy.arange(length)[None, :] < lengths[:, None]
+        matrix[mask] = numpy.frombuffer(b''.join(ciphertexts), dtype=numpy.uint8)
+        # one bincount for all the positions: position j gets values j*256 + b
+        positions = numpy.arange(length)[None, :] * 256
+        self._counts[:length] += numpy.bincount(
+            (matrix + positions)[mask], minlength=256 * length).reshape(length, 256)
+
+    def _solve_numpy(self):
+        numpy = self._numpy
+        counts = self._counts
+        # evidence[j, v]: number of ciphertexts whose byte at position j
+        # XORed with v is a letter or zero, including the ciphertext with v itself
+        evidence = counts @ _partners_table()
+        # only the values present at each position are candidates
+        evidence[counts == 0] = -1
+        best = evidence.argmax(axis=1)
+        totals = counts.sum(axis=1)
+        others = numpy.maximum(totals - 1, 1)
+        confidence = (evidence[numpy.arange(len(best)), best] - 1) / others
+        confidence[totals < 2] = 0
+        return bytes((best ^ SPACE).tolist()), confidence.tolist()
+
+    def _solve_python(self):
+        key = bytearray()
+        confidence = []
+        for counts in self._counts:
+            best_value, best_evidence = 0, -1
+            # smallest value first on ties, as numpy.argmax
+            for v in sorted(counts):
+                evidence = sum(counts.get(v ^ u, 0) for u in _SPACE_PARTNERS)
+                if evidence > best_evidence:
+                    best_value, best_evidence = v, evidence
+            key.append(best_value ^ SPACE)
+            total = sum(counts.values())
+            confidence.append((best_evidence - 1) / (total - 1) if total >= 2 else 0)
+        return bytes(key), confidence
+
+    def key(self):
+        '''(key, confidence): the most likely keystream,
+        and for each position the fraction of the other ciphertexts
+        agreeing that the ciphertext used there encrypts a space'''
+        if self._key is None:
+            if self._numpy is not None:
+                self._key = self._solve_numpy()
+            else:
+                self._key = self._solve_python()
+        return self._key
+
+    def decrypt(self, ciphertext):
+        '''decryption with the current key
+        (the result is cut to the length of the key)'''
+        return bxor(ciphertext, self.key()[0], longest=False)
+
+    def plaintexts(self):
+        return [self.decrypt(c) for c in self.ciphertexts]
@@ -0,0 +1,262 @@
+'''Mersenne Twister PRNG and its cloning'''
+
+import sys
+from array import array
+from math import ceil
+
+from . import optional
+
+
+class MT19937:
+    '''Mersenne-Twister PRNG, 32-bit version
+
+    The 624-word state is regenerated all at once (the "twist")
+    and is then output 624 words at a time,
+    which gives the same output as shifting the state by one word
+    for every output number.
+    '''
+
+    # parameters for MT19937-32
+    (w, n, m, r) = (32, 624, 397, 31)
+    a = 0x9908B0DF
+    (u, d) = (11, 0xFFFFFFFF)
+    (s, b) = (7, 0x9D2C5680)
+    (t, c) = (15, 0xEFC60000)
+    l = 18
+    f = 1812433253
+
+    # masks (to apply with an '&' operator)
+    # ---------------------------------------
+    # zeroes out all bits except "the w-r highest bits"
+    # (i.e. with our parameters the single highest bit, since w-r=1)
+    high_mask = ((1 << w) - 1) - ((1 << r) - 1)
+    # zeroes out all bits excepts "the r lowest bits"
+    low_mask = (1 << r) - 1
+
+    def __init__(self, seed=5489, state=None):
+        n, w, d, f = self.n, self.w, self.d, self.f
+        if state is None:
+            # initialization (populating the state)
+            words = [seed]
+            for i in range(1, n):
+                prev = words[-1]
+                # the "& d" is to take only the lowest 32 bits of the result
+                words.append((f * (prev ^ (prev >> (w - 2))) + i) & d)
+            # only the highest bit of the first word is ever used
+            words[0] &= d
+        else:
+            # the previous 624 words, for instance recovered by cloning
+            words = state if isinstance(state, array) else list(state)
+            if len(words) != n:
+                raise ValueError('state must contain %d words' % n)
+
+        # the backend is chosen once, when the state is created
+        self._numpy = optional.numpy()
+        if self._numpy is not None:
+            self._state = self._numpy.array(words, dtype=self._numpy.uint32)
+        else:
+            self._state = array('I', words)
+        # tempered outputs of the current state, and position in it
+        self._outputs = array('I')
+        self._index = n
+
+    def _twist(self):
+        if self._numpy is not None:
+            self._twist_numpy()
+        else:
+            self._twist_python()
+
+    def _twist_python(self):
+        (n, m, a) = (self.n, self.m, self.a)
+        high_mask, low_mask = self.high_mask, self.low_mask
+        mt = self._state
+        for i in range(n):
+            x = (mt[i] & high_mask) + (mt[(i + 1) % n] & low_mask)
+            mt[i] = mt[(i + m) % n] ^ (x >> 1) ^ (a if x % 2 == 1 else 0)
+
+        (u, s, b, t, c, l) = (self.u, self.s, self.b, self.t, self.c, self.l)
+        outputs = array('I', mt)
+        for i, y in enumerate(outputs):
+            y = y ^ (y >> u)
+            y = y ^ ((y << s) & b)
+            y = y ^ ((y << t) & c)
+            outputs[i] = y ^ (y >> l)
+        self._outputs = outputs
+
+    def _twist_numpy(self):
+        (n, m) = (self.n, self.m)
+        mt = self._state
+        a = self._numpy.uint32(self.a)
+
+        # word i depends on word i+m, which is updated before word i
+        # when i+m >= n: the words are thus updated by slices
+        # that only depend on slices already updated
+        for lo, hi in [(0, n - m), (n - m, 2 * (n - m)), (2 * (n - m), n - 1)]:
+            x = (mt[lo:hi] & self.high_mask) | (mt[lo + 1:hi + 1] & self.low_mask)
+            mt[lo:hi] = (mt[(lo + m) % n:(hi + m - 1) % n + 1]
+                         ^ (x >> 1) ^ ((x & 1) * a))
+        # the last word depends on the (new) first word
+        x = (int(mt[n - 1]) & self.high_mask) | (int(mt[0]) & self.low_mask)
+        mt[n - 1] = int(mt[m - 1]) ^ (x >> 1) ^ (self.a if x % 2 == 1 else 0)
+
+        # tempering transform of the whole state at once
+        y = mt ^ (mt >> self.u)
+        y ^= (y << self.s) & self.b
+        y ^= (y << self.t) & self.c
+        y ^= y >> self.l
+        outputs = array('I')
+        outputs.frombytes(y.tobytes())
+        self._outputs = outputs
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._index == self.n:
+            self._twist()
+            self._index = 0
+        self._index += 1
+        return self._outputs[self._index - 1]
+
+    def random_words(self, count):
+        '''the next "count" 32-bit outputs, as an array('I')'''
+        result = array('I')
+        while len(result) < count:
+            if self._index == self.n:
+                self._twist()
+                self._index = 0
+            end = min(self.n, self._index + count - len(result))
+            result += self._outputs[self._index:end]
+            self._index = end
+        return result
+
+    def random_bytes(self, count):
+        '''"count" keystream bytes: each output is 4 bytes (little-endian),
+        same as random.Random.randbytes
+        (the last output is consumed entirely, only its highest bytes are used)'''
+        words = self.random_words(ceil(count / 4))
+        if count % 4:
+            words[-1] >>= 32 - 8 * (count % 4)
+        if sys.byteorder == 'big':
+            words.byteswap()
+        return words.tobytes()[:count]
+
+    def getrandbits(self, k):
+        '''k random bits, same as random.Random.getrandbits'''
+        if k < 0:
+            raise ValueError('number of bits must be non-negative')
+        if k <= 32:
+            return next(self) >> (32 - k) if k else 0
+        # first output in the lowest bits,
+        # only the highest bits of the last output are used
+        words = self.random_words(ceil(k / 32))
+        words[-1] >>= -k % 32
+        if sys.byteorder == 'big':
+            words.byteswap()
+        return int.from_bytes(words.tobytes(), byteorder='little')
+
+
+def MT19937_32(seed=5489, state=None):
+    '''Mersenne-Twister PRNG, 32-bit version (generator)'''
+    yield from MT19937(seed, state)
+
+
+# Mersenne Twister cloning
+# -------------------------
+# the tempering transform is invertible: untempering 624 consecutive
+# outputs gives 624 consecutive words of the internal state
+
+def _undo_right_shift_xor(y, shift):
+    # inverse of y = x ^ (x >> shift)
+    # every iteration recovers "shift" more bits (from the highest ones)
+    x = y
+    for _ in range(MT19937.w // shift):
+        x = y ^ (x >> shift)
+    return x
+
+
+def _undo_left_shift_xor_and(y, shift, mask):
+    # inverse of y = x ^ ((x << shift) & mask)
+    # every iteration recovers "shift" more bits (from the lowest ones)
+    x = y
+    for _ in range(MT19937.w // shift):
+        x = y ^ ((x << shift) & mask)
+    return x
+
+
+def untemper(y):
+    '''inverse of the MT19937 tempering transform;
+    y is an integer or a NumPy uint32 array (all words untempered at once)'''
+    mt = MT19937
+    y = _undo_right_shift_xor(y, mt.l)
+    y = _undo_left_shift_xor_and(y, mt.t, mt.c)
+    y = _undo_left_shift_xor_and(y, mt.s, mt.b)
+    return _undo_right_shift_xor(y, mt.u)
+
+
+def untemper_words(outputs):
+    '''untempers a sequence of 32-bit outputs, returns an array('I')'''
+    numpy = optional.numpy()
+    if numpy is not None:
+        words = untemper(numpy.asarray(outputs, dtype=numpy.uint32))
+        result = array('I')
+        result.frombytes(words.tobytes())
+        return result
+    return array('I', [untemper(y) for y in outputs])
+
+
+def clone_mt19937(outputs):
+    '''MT19937 generator that continues the sequence "outputs"
+    (at least 624 consecutive outputs of a MT19937 generator)
+
+    the state is recovered from the first 624 outputs,
+    the remaining ones are used to check the clone (ValueError if it fails)'''
+    n = MT19937.n
+    outputs = array('I', outputs)
+    if len(outputs) < n:
+        raise ValueError('at least %d outputs are needed, got %d'
+                         % (n, len(outputs)))
+    clone = MT19937(state=untemper_words(outputs[:n]))
+    if clone.random_words(len(outputs) - n) != outputs[n:]:
+        raise ValueError('outputs are not consecutive MT19937 outputs')
+    return clone
+
+
+def clone_mt19937_from_bytes(stream):
+    '''clone from a MT19937 keystream (see MT19937.random_bytes)
+    of any length (at least 624 * 4 bytes)'''
+    stream = memoryview(stream).cast('B')
+    nb_words, remainder = divmod(len(stream), 4)
+    words = array('I')
+    words.frombytes(stream[:4 * nb_words])
+    if sys.byteorder == 'big':
+        words.byteswap()
+    clone = clone_mt19937(words)
+    if remainder:
+        # the last output was only partially used but consumed entirely
+        if clone.random_bytes(remainder) != stream[4 * nb_words:]:
+            raise ValueError('stream is not a MT19937 keystream')
+    return clone
+
+
+def clone_mt19937_many(sessions):
+    '''clones one generator per sequence of outputs,
+    untempering all the sequences at once'''
+    n = MT19937.n
+    sessions = [array('I', outputs) for outputs in sessions]
+    for outputs in sessions:
+        if len(outputs) < n:
+            raise ValueError('at least %d outputs are needed, got %d'
+                             % (n, len(outputs)))
+    words = array('I')
+    for outputs in sessions:
+        words += outputs[:n]
+    states = untemper_words(words)
+    clones = []
+    for i, outputs in enumerate(sessions):
+        clone = MT19937(state=states[i * n:(i + 1) * n])
+        if clone.random_words(len(outputs) - n) != outputs[n:]:
+            raise ValueError('session %d: outputs are not consecutive '
+                             'MT19937 outputs' % i)
+        clones.append(clone)
+    return clones
@@ -0,0 +1,20 @@
+'''optional dependencies, imported the first time they are needed'''
+
+import importlib
+from functools import lru_cache
+
+# set to False to use the pure-Python code even if NumPy is installed
+USE_NUMPY = True
+
+
+@lru_cache(maxsize=None)
+def _import(name):
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+def numpy():
+    '''the numpy module, or None if it is not installed (or not used)'''
+    return _import('numpy') if USE_NUMPY else None
@@ -0,0 +1,460 @@
+'''oracle harness: instrumentation, memoization and a local network stand-in
+
+InstrumentedOracle wraps any oracle (a function of one message)
+and counts the queries, keeps a latency histogram
+and answers repeated queries from a cache.
+
+OracleServer serves oracles over TCP from a background thread,
+with an optional latency per query, so that attacks can be run
+(and benchmarked) as if the oracles were remote endpoints.
+RemoteOracle is the matching client, its "map" method sends
+the queries by batches, several batches in parallel on several connections.
+
+Protocol: a request is the oracle name (one byte of length, then the name)
+and the message (4 bytes of length, big-endian, then the message).
+A response is a type byte ("b" bytes, "T" True, "F" False, "N" None,
+"E" error) and a payload (4 bytes of length, then the payload:
+the bytes returned or the error message).
+Responses come in the order of the requests, a client can send
+many requests before reading the answers (pipelining).
+'''
+
+import random
+import socket
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+
+class OracleError(Exception):
+    '''the remote oracle raised an exception'''
+    pass
+
+
+def _latency_bucket(seconds):
+    # upper bound of the power-of-two bucket, in microseconds
+    return 1 << int(seconds * 1e6).bit_length()
+
+
+class InstrumentedOracle:
+    '''an oracle (function of one message) with query counting,
+    a latency histogram and a cache of the answers.
+
+    The cache is only correct for deterministic oracles
+    (not for an encryption with a random IV for instance),
+    use cache=False for the others. cache_size bounds the number of
+    answers kept (least recently used first out), None for no limit.
+    Exceptions raised by the oracle are counted and raised again, never cached.
+    Can be used from several threads.
+    '''
+
+    def __init__(self, oracle, cache=True, cache_size=None):
+        self.oracle = oracle
+        self.cache = OrderedDict() if cache else None
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        '''clear the counters (not the cache)'''
+        with self._lock:
+            self.queries = 0
+            self.cache_hits = 0
+            self.oracle_queries = 0
+            self.errors = 0
+            self.seconds = 0.0
+            self.histogram = dict()
+
+    def _cached(self, message):
+        # (True, answer) or (False, None), counts the query
+        with self._lock:
+            self.queries += 1
+            if self.cache is not None and message in self.cache:
+                self.cache_hits += 1
+                self.cache.move_to_end(message)
+                return True, self.cache[message]
+        return False, None
+
+    def _record(self, messages, answers, seconds):
+        # each message of a batch waited for the whole batch
+        bucket = _latency_bucket(seconds)
+        with self._lock:
+            self.oracle_queries += len(messages)
+            self.seconds += seconds
+            self.histogram[bucket] = self.histogram.get(bucket, 0) + len(messages)
+            if self.cache is None or answers is None:
+                return
+            for message, answer in zip(messages, answers):
+                self.cache[message] = answer
+            if self.cache_size is not None:
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+
+    def __call__(self, message):
+        message = bytes(message)
+        hit, answer = self._cached(message)
+        if hit:
+            return answer
+        start = time.perf_counter()
+        try:
+            answer = self.oracle(message)
+        except Exception:
+            self._record([message], None, time.perf_counter() - start)
+            with self._lock:
+                self.errors += 1
+            raise
+        self._record([message], [answer], time.perf_counter() - start)
+        return answer
+
+    def map(self, messages):
+        '''answers to a list of messages, in order. Messages not in the cache
+        are sent in one batch with the "map" method of the oracle if it has one
+        (see RemoteOracle), else one at a time'''
+        messages = [bytes(m) for m in messages]
+        answers = [None] * len(messages)
+        # each message still to ask -> its indexes in the list
+        missing = dict()
+        for i, message in enumerate(messages):
+            hit, answer = self._cached(message)
+            if hit:
+                answers[i] = answer
+            elif message in missing:
+                # asked twice in the batch: the second is a cache hit
+                missing[message].append(i)
+                with self._lock:
+                    self.cache_hits += 1
+            else:
+                missing[message] = [i]
+        if not missing:
+            return answers
+
+        batch = list(missing)
+        start = time.perf_counter()
+        try:
+            if hasattr(self.oracle, 'map'):
+                batch_answers = self.oracle.map(batch)
+            else:
+                batch_answers = [self.oracle(m) for m in batch]
+        except Exception:
+            self._record(batch, None, time.perf_counter() - start)
+            with self._lock:
+                self.errors += 1
+            raise
+        self._record(batch, batch_answers, time.perf_counter() - start)
+        for message, answer in zip(batch, batch_answers):
+            for i in missing[message]:
+                answers[i] = answer
+        return answers
+
+    def stats(self):
+        '''counters as a dict with keys "queries", "cache_hits",
+        "oracle_queries" (queries that reached the oracle), "errors",
+        "seconds" (total time spent in the oracle), "mean_latency" (seconds)
+        and "latency_histogram" ({upper bound in microseconds: number of
+        oracle queries}, power-of-two buckets)'''
+        with self._lock:
+            return {
+                'queries': self.queries,
+                'cache_hits': self.cache_hits,
+                'oracle_queries': self.oracle_queries,
+                'errors': self.errors,
+                'seconds': self.seconds,
+                'mean_latency': self.seconds / self.oracle_queries if self.oracle_queries else 0.0,
+                'latency_histogram': dict(sorted(self.histogram.items())),
+            }
+
+
+# ---------- network stand-in ----------
+
+def _encode_answer(answer):
+    if isinstance(answer, (bytes, bytearray, memoryview)):
+        kind, payload = b'b', bytes(answer)
+    elif answer is True:
+        kind, payload = b'T', b''
+    elif answer is False:
+        kind, payload = b'F', b''
+    elif answer is None:
+        kind, payload = b'N', b''
+    else:
+        raise TypeError('oracle answers must be bytes, bool or None, not %r'
+                        % type(answer).__name__)
+    return kind + struct.pack('>I', len(payload)) + payload
+
+
+def _encode_error(text):
+    error = text.encode(errors='replace')
+    return b'E' + struct.pack('>I', len(error)) + error
+
+
+def _encode_request(name, message):
+    return bytes([len(name)]) + name + struct.pack('>I', len(message)) + message
+
+
+def _decode_answer(kind, payload):
+    if kind == b'b':
+        return payload
+    if kind == b'T':
+        return True
+    if kind == b'F':
+        return False
+    if kind == b'N':
+        return None
+    raise OracleError(payload.decode(errors='replace'))
+
+
+class OracleServer:
+    '''TCP server answering queries to the given oracles
+    ({name: function of one message}) from a background thread.
+
+    latency: seconds added to every query (plus a random delay
+             up to "jitter"), queries wait concurrently as for
+             a remote endpoint.
+    max_concurrency: number of queries answered at the same time
+                     (None: no limit), the others wait their turn.
+
+    Use as a context manager, or call start() and close().
+    The address to connect to is in the "address" attribute once started.
+    '''
+
+    def __init__(self, oracles, host='127.0.0.1', port=0,
+                 latency=0.0, jitter=0.0, max_concurrency=None):
+        self.oracles = {name.encode() if isinstance(name, str) else name: oracle
+                        for name, oracle in oracles.items()}
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.max_concurrency = max_concurrency
+        self.address = None
+        self._loop = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        '''start serving, returns once the server accepts connections'''
+        import asyncio
+
+        started = threading.Event()
+        failure = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            try:
+                self._server = loop.run_until_complete(self._start(asyncio))
+            except Exception as e:
+                failure.append(e)
+                started.set()
+                loop.close()
+                return
+            self._loop = loop
+            self.address = self._server.sockets[0].getsockname()[:2]
+            started.set()
+            try:
+                loop.run_forever()
+            finally:
+                loop.close()
+
+        self._thread = threading.Thread(target=run, name='OracleServer', daemon=True)
+        self._thread.start()
+        started.wait()
+        if failure:
+            raise failure[0]
+        return self
+
+    def close(self):
+        if self._loop is not None:
+            import asyncio
+
+            asyncio.run_coroutine_threadsafe(self._stop(asyncio), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+
+    async def _stop(self, asyncio):
+        # connections still open are cut, their queries in progress are dropped
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        while self._writers:
+            await asyncio.sleep(0.001)
+        await self._server.wait_closed()
+
+    async def _start(self, asyncio):
+        self._writers = set()
+        self._semaphore = (asyncio.Semaphore(self.max_concurrency)
+                           if self.max_concurrency is not None else None)
+        return await asyncio.start_server(
+            lambda reader, writer: self._handle(asyncio, reader, writer),
+            self.host, self.port)
+
+    async def _answer(self, asyncio, name, message):
+        if name not in self.oracles:
+            return _encode_error('unknown oracle %r' % name.decode(errors='replace'))
+        if self._semaphore is not None:
+            await self._semaphore.acquire()
+        try:
+            delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                return _encode_answer(self.oracles[name](message))
+            except Exception as e:
+                return _encode_error('%s: %s' % (type(e).__name__, e))
+        finally:
+            if self._semaphore is not None:
+                self._semaphore.release()
+
+    async def _handle(self, asyncio, reader, writer):
+        # requests are answered concurrently, responses are written in order
+        pending = asyncio.Queue()
+        self._writers.add(writer)
+
+        async def write_responses():
+            while True:
+                task = await pending.get()
+                if task is None:
+                    break
+                writer.write(await task)
+                if pending.empty():
+                    await writer.drain()
+
+        writing = asyncio.ensure_future(write_responses())
+        try:
+            while True:
+                header = await reader.readexactly(1)
+                name = await reader.readexactly(header[0])
+                length, = struct.unpack('>I', await reader.readexactly(4))
+                message = await reader.readexactly(length)
+                await pending.put(asyncio.ensure_future(self._answer(asyncio, name, message)))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            await pending.put(None)
+            try:
+                await writing
+            except ConnectionError:
+                pass
+            writer.close()
+            self._writers.discard(writer)
+
+
+class RemoteOracle:
+    '''client for one oracle of an OracleServer (or any server
+    speaking the same protocol), address is (host, port).
+
+    Calling it sends one query and waits for the answer.
+    map sends a list of queries by batches of "pipeline" requests
+    written before reading the answers, on "connections" connections
+    in parallel (one thread each).
+    Single queries and batches sent from one thread share a connection
+    (opened on first use, see close), the parallel batches of map get their own.
+    '''
+
+    def __init__(self, address, name, connections=4, pipeline=64, timeout=None):
+        self.address = tuple(address)
+        self.name = name.encode() if isinstance(name, str) else name
+        self.connections = connections
+        self.pipeline = pipeline
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _connect(self):
+        sock = socket.create_connection(self.address, timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock, sock.makefile('rb')
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def _read_exactly(self, stream, size):
+        data = stream.read(size)
+        if len(data) != size:
+            raise ConnectionError('connection closed by the oracle server')
+        return data
+
+    def _query_batch(self, messages, connection):
+        # answers (or OracleError instances) of messages sent in one write
+        sock, stream = connection
+        sock.sendall(b''.join(_encode_request(self.name, bytes(m)) for m in messages))
+        answers = []
+        for _ in messages:
+            header = self._read_exactly(stream, 5)
+            payload = self._read_exactly(stream, struct.unpack('>I', header[1:])[0])
+            try:
+                answers.append(_decode_answer(header[:1], payload))
+            except OracleError as e:
+                answers.append(e)
+        return answers
+
+    def _map_serial(self, messages, connection=None):
+        if connection is None:
+            connection = self._connection()
+        try:
+            answers = []
+            for i in range(0, len(messages), self.pipeline):
+                answers.extend(self._query_batch(messages[i:i + self.pipeline], connection))
+            return answers
+        except OSError:
+            # the connection is in an unknown state, the next query opens another one
+            if connection is getattr(self._local, 'connection', None):
+                self.close()
+            raise
+
+    def _map_connection(self, messages):
+        # on a connection of its own, closed at the end
+        connection = self._connect()
+        try:
+            return self._map_serial(messages, connection)
+        finally:
+            connection[1].close()
+            connection[0].close()
+
+    def close(self):
+        '''close the connection of the calling thread'''
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            self._local.connection = None
+            connection[1].close()
+            connection[0].close()
+
+    def __call__(self, message):
+        answer, = self._map_serial([message])
+        if isinstance(answer, OracleError):
+            raise answer
+        return answer
+
+    def map(self, messages):
+        '''answers to a list of messages, in order; raises OracleError
+        if the oracle raised an exception for any of them'''
+        messages = list(messages)
+        if self.connections <= 1 or len(messages) <= self.pipeline:
+            answers = self._map_serial(messages)
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+
+            # one contiguous part of the messages per connection
+            size = -(-len(messages) // self.connections)
+            parts = [messages[i:i + size] for i in range(0, len(messages), size)]
+            with ThreadPoolExecutor(max_workers=len(parts)) as executor:
+                answers = [a for part in executor.map(self._map_connection, parts)
+                           for a in part]
+        for answer in answers:
+            if isinstance(answer, OracleError):
+                raise answer
+        return answers
@@ -0,0 +1,35 @@
+'''PKCS#7 padding'''
+
+
+class PaddingError(Exception):
+    pass
+
+
+def pkcs7_padding(message, block_size):
+    padding_length = block_size - (len(message) % block_size)
+    if padding_length == 0:
+        padding_length = block_size
+    padding = bytes([padding_length]) * padding_length
+    return message + padding
+
+
+def pkcs7_strip(x, block_size):
+    if not len(x) % block_size == 0:
+        raise PaddingError
+
+    last_byte = x[-1]
+
+    # the 'int' is superfluous here
+    # as last_byte is already an int (for Python a byte string is a list of integers)
+    # but this way it's clearer what we are doing
+    padding_size = int(last_byte)
+
+    if padding_size > block_size:
+        raise PaddingError('illegal last byte (greater than block size)')
+    if padding_size == 0:
+        raise PaddingError('illegal last byte (zero)')
+
+    if not x.endswith(bytes([last_byte]) * padding_size):
+        raise PaddingError
+
+    return x[:-padding_size]
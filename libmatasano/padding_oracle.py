@@ -0,0 +1,313 @@
+'''CBC padding oracle attack (challenge 17)
+
+A padding oracle tells whether a CBC ciphertext decrypts to a correctly
+padded (PKCS#7) plaintext. Sending a forged previous block X followed by
+a ciphertext block C, the last plaintext byte is D(C)[15] ^ X[15]:
+the oracle accepts the guess of X[15] giving 0x01, which gives D(C)[15],
+then X[15] is set to give 0x02 and X[14] is guessed, and so on.
+The plaintext is D(C) XOR the real previous block.
+
+Every block only needs its previous block, so all the blocks are
+attacked at the same time: each oracle round trip carries the guesses
+of many blocks, and several round trips are in flight at once (asyncio).
+'''
+
+import inspect
+import os
+import time
+
+from . import optional
+from .aes import aes_128_ecb_decryptor, decrypt_aes_128_cbc, encrypt_aes_128_cbc
+from .attacks import ENGLISH_FREQ_ORDER
+from .blocks import BLOCK_SIZE
+from .padding import PaddingError, pkcs7_strip
+from .xor import bxor
+
+
+def _plaintext_order():
+    # plaintext bytes from the most likely to the least likely (english text)
+    order = (ENGLISH_FREQ_ORDER + ENGLISH_FREQ_ORDER[1:].upper()
+             + b'.,\'"-\n;:!?()0123456789'
+             + bytes(range(32, 127)) + b'\r\t' + bytes(range(256)))
+    return list(dict.fromkeys(order))
+
+
+# the guesses of a byte are sent by waves, the next wave only when
+# the previous one had no valid padding
+_TEXT_ORDER = _plaintext_order()
+# last byte of the last block: the padding length
+_PADDING_ORDER = list(dict.fromkeys(list(range(1, BLOCK_SIZE + 1)) + _TEXT_ORDER))
+
+
+def _waves(order, wave_sizes):
+    waves = []
+    start = 0
+    for size in wave_sizes:
+        if start < len(order):
+            waves.append(bytes(order[start:start + size]))
+        start += size
+    if start < len(order):
+        waves.append(bytes(order[start:]))
+    return waves
+
+
+# _XOR_TABLES[k]: translation table of XOR with k
+_XOR_TABLES = [bytes(i ^ k for i in range(256)) for k in range(256)]
+# _HEADS[j][x]: the first j + 1 bytes of a forged block, j zeros and x
+_HEADS = [[bytes(j) + bytes([x]) for x in range(256)] for j in range(BLOCK_SIZE)]
+
+
+class _Block:
+    # attack state of one ciphertext block
+
+    def __init__(self, previous, block, last):
+        self.previous = previous
+        self.block = block
+        self.last = last
+        # D(block), found from the end
+        self.intermediate = bytearray(BLOCK_SIZE)
+        self.position = BLOCK_SIZE - 1
+        self.wave = 0
+        # valid guesses of the last byte, to confirm (see messages)
+        self.checking = []
+        self.queries = [0] * BLOCK_SIZE
+
+    def messages(self, waves, padding_waves):
+        '''the messages of the next round trip, with the guessed values'''
+        j = self.position
+        if self.checking:
+            # 0x02 0x02 (or longer) padding is also valid when guessing the
+            # last byte: a guess is confirmed if it stays valid with X[14] changed
+            values = self.checking
+            return values, [bytes(BLOCK_SIZE - 2) + b'\x01' + bytes([x]) + self.block
+                            for x in values]
+        pad = BLOCK_SIZE - j
+        suffix = self.intermediate[j + 1:].translate(_XOR_TABLES[pad]) + self.block
+        waves = padding_waves if self.last and j == BLOCK_SIZE - 1 else waves
+        if self.wave >= len(waves):
+            raise ValueError('no valid padding for byte %d of a block, '
+                             'is the oracle right?' % j)
+        # forged byte for each guess p of the plaintext byte
+        values = waves[self.wave].translate(_XOR_TABLES[self.previous[j] ^ pad])
+        heads = _HEADS[j]
+        return values, [heads[x] + suffix for x in values]
+
+    def update(self, values, answers):
+        '''takes the answers of the oracle, returns True once the block is done'''
+        j = self.position
+        self.queries[j] += len(values)
+        valid = [x for x, answer in zip(values, answers) if answer]
+        if self.checking:
+            self.checking = []
+            if not valid:
+                self.wave += 1
+                return False
+        elif not valid:
+            self.wave += 1
+            return False
+        elif j == BLOCK_SIZE - 1:
+            self.checking = valid
+            return False
+
+        self.intermediate[j] = valid[0] ^ (BLOCK_SIZE - j)
+        self.position -= 1
+        self.wave = 0
+        if self.last and j == BLOCK_SIZE - 1:
+            # the padding bytes are all known from its length
+            length = self.intermediate[j] ^ self.previous[j]
+            if 1 <= length <= BLOCK_SIZE:
+                for k in range(BLOCK_SIZE - length, j):
+                    self.intermediate[k] = length ^ self.previous[k]
+                self.position = j - length
+        return self.position < 0
+
+    def plaintext(self):
+        return bxor(self.intermediate, self.previous)
+
+
+def _batch_query(oracle, executor):
+    # the oracle as a coroutine function of a list of messages
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    batch = getattr(oracle, 'map', None)
+    if batch is not None and inspect.iscoroutinefunction(batch):
+        return batch
+    if batch is None and inspect.iscoroutinefunction(oracle):
+        async def query(messages):
+            return await asyncio.gather(*[oracle(m) for m in messages])
+        return query
+    if batch is None:
+        def batch(messages):
+            return [oracle(m) for m in messages]
+
+    async def query(messages):
+        return await loop.run_in_executor(executor, batch, messages)
+    return query
+
+
+async def attack_padding_oracle_async(ciphertext, oracle, iv=None, concurrency=8,
+                                      blocks_per_batch=256, wave_sizes=(16, 112)):
+    '''coroutine version of attack_padding_oracle'''
+    from concurrent.futures import ThreadPoolExecutor
+
+    if iv is not None:
+        ciphertext = iv + ciphertext
+    if len(ciphertext) % BLOCK_SIZE != 0 or len(ciphertext) < 2 * BLOCK_SIZE:
+        raise ValueError('the IV and ciphertext must be at least two full blocks')
+    nb_blocks = len(ciphertext) // BLOCK_SIZE - 1
+    blocks = [_Block(ciphertext[i * BLOCK_SIZE:(i + 1) * BLOCK_SIZE],
+                     ciphertext[(i + 1) * BLOCK_SIZE:(i + 2) * BLOCK_SIZE],
+                     i == nb_blocks - 1)
+              for i in range(nb_blocks)]
+    waves = _waves(_TEXT_ORDER, wave_sizes)
+    padding_waves = _waves(_PADDING_ORDER, wave_sizes)
+
+    # small ciphertexts are split too, so that all the round trips are used
+    group_size = max(1, min(blocks_per_batch, -(-nb_blocks // concurrency)))
+    groups = iter(range(0, nb_blocks, group_size))
+    round_trips = 0
+
+    async def attack_groups(query):
+        # attacks groups of blocks, one after the other
+        nonlocal round_trips
+        for start in groups:
+            active = blocks[start:start + group_size]
+            while active:
+                queries = [block.messages(waves, padding_waves) for block in active]
+                answers = await query([m for _, messages in queries for m in messages])
+                round_trips += 1
+                still_active = []
+                offset = 0
+                for block, (values, _) in zip(active, queries):
+                    if not block.update(values, answers[offset:offset + len(values)]):
+                        still_active.append(block)
+                    offset += len(values)
+                active = still_active
+
+    import asyncio
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        query = _batch_query(oracle, executor)
+        await asyncio.gather(*[attack_groups(query) for _ in range(concurrency)])
+
+    padded = b''.join(block.plaintext() for block in blocks)
+    try:
+        plaintext = pkcs7_strip(padded, BLOCK_SIZE)
+    except PaddingError:
+        plaintext = padded
+    queries_per_byte = [n for block in blocks for n in block.queries]
+    return {
+        'plaintext': plaintext,
+        'queries': sum(queries_per_byte),
+        'queries_per_byte': queries_per_byte,
+        'round_trips': round_trips,
+    }
+
+
+def attack_padding_oracle(ciphertext, oracle, iv=None, concurrency=8,
+                          blocks_per_batch=256, wave_sizes=(16, 112)):
+    '''decrypts a CBC ciphertext with a padding oracle.
+
+    oracle: function of one message (an IV followed by ciphertext blocks)
+            returning True if it decrypts with a valid PKCS#7 padding.
+            Messages have two blocks: a forged IV and a ciphertext block.
+            It can be a coroutine function, or have a "map" method
+            (or coroutine) answering a list of messages at once,
+            as RemoteOracle or InstrumentedOracle; blocking oracles
+            are called from a pool of "concurrency" threads.
+    iv: the IV, if None it is the first block of the ciphertext.
+    concurrency: number of oracle round trips in flight.
+    blocks_per_batch: number of blocks whose guesses share a round trip.
+    wave_sizes: the guesses for a byte are sent by waves, the most likely
+                plaintext bytes first (padding lengths for the last byte,
+                then english text), the next wave only if the previous
+                one had no valid padding; the last wave has the remaining guesses.
+
+    The last block is assumed correctly padded: once the padding length is
+    known the padding bytes are not guessed.
+    Returns a dict with keys "plaintext" (padding removed), "queries",
+    "queries_per_byte" (for each byte of the padded plaintext, 0 for the padding
+    bytes after the first) and "round_trips" (calls to the oracle or its map method).
+    Not usable from a running event loop, see attack_padding_oracle_async.
+    '''
+    import asyncio
+
+    return asyncio.run(attack_padding_oracle_async(
+        ciphertext, oracle, iv, concurrency, blocks_per_batch, wave_sizes))
+
+
+class CBCPaddingOracle:
+    '''local padding oracle for experiments (challenge 17's server):
+    encrypt gives IV + ciphertext under a random key,
+    calling it with IV + ciphertext tells if the padding is valid.
+
+    latency: seconds waited by each call (to __call__ or to map,
+             a batch waits only once as with a batch endpoint).
+    '''
+
+    def __init__(self, key=None, latency=0.0):
+        self.key = os.urandom(16) if key is None else key
+        self.latency = latency
+
+    def encrypt(self, message):
+        iv = os.urandom(BLOCK_SIZE)
+        return iv + encrypt_aes_128_cbc(message, iv, self.key)
+
+    def decrypt(self, ciphertext):
+        return decrypt_aes_128_cbc(ciphertext[BLOCK_SIZE:], ciphertext[:BLOCK_SIZE], self.key)
+
+    def __call__(self, ciphertext):
+        if self.latency:
+            time.sleep(self.latency)
+        try:
+            self.decrypt(ciphertext)
+        except (PaddingError, ValueError):
+            return False
+        return True
+
+    def map(self, ciphertexts):
+        '''validity of each ciphertext, the last blocks of all of them
+        decrypted in one call'''
+        if self.latency:
+            time.sleep(self.latency)
+        ciphertexts = list(ciphertexts)
+        well_formed = [len(c) % BLOCK_SIZE == 0 and len(c) >= 2 * BLOCK_SIZE
+                       for c in ciphertexts]
+        candidates = [c for c, ok in zip(ciphertexts, well_formed) if ok]
+        if not candidates:
+            return [False] * len(ciphertexts)
+        decryptor = aes_128_ecb_decryptor(self.key)
+
+        numpy = optional.numpy()
+        if numpy is not None:
+            # with the same length (as the messages of the attack)
+            # the last two blocks are columns of one matrix
+            length = len(candidates[0])
+            if all(len(c) == length for c in candidates):
+                pairs = numpy.frombuffer(b''.join(candidates), dtype=numpy.uint8)
+                pairs = pairs.reshape(-1, length)[:, -2 * BLOCK_SIZE:]
+                decrypted = decryptor.update(pairs[:, BLOCK_SIZE:].tobytes())
+                plain = numpy.frombuffer(decrypted, dtype=numpy.uint8).reshape(-1, BLOCK_SIZE)
+                plain = plain ^ pairs[:, :BLOCK_SIZE]
+            else:
+                decrypted = decryptor.update(b''.join(c[-BLOCK_SIZE:] for c in candidates))
+                plain = numpy.frombuffer(bxor(decrypted, b''.join(
+                    c[-2 * BLOCK_SIZE:-BLOCK_SIZE] for c in candidates)), dtype=numpy.uint8)
+                plain = plain.reshape(-1, BLOCK_SIZE)
+            # only the last plaintext block holds the padding
+            padding = plain[:, -1].astype(numpy.int64)
+            in_padding = numpy.arange(BLOCK_SIZE)[None, :] >= BLOCK_SIZE - padding[:, None]
+            valid = (((plain == plain[:, -1:]) | ~in_padding).all(axis=1)
+                     & (padding >= 1) & (padding <= BLOCK_SIZE)).tolist()
+        else:
+            decrypted = decryptor.update(b''.join(c[-BLOCK_SIZE:] for c in candidates))
+            plain = bxor(decrypted, b''.join(c[-2 * BLOCK_SIZE:-BLOCK_SIZE] for c in candidates))
+            valid = []
+            for i in range(0, len(plain), BLOCK_SIZE):
+                block = plain[i:i + BLOCK_SIZE]
+                padding = block[-1]
+                valid.append(1 <= padding <= BLOCK_SIZE
+                             and block.endswith(bytes([padding]) * padding))
+        valid = iter(valid)
+        return [ok and next(valid) for ok in well_formed]
@@ -0,0 +1,217 @@
+'''password search: SHA-1 preimage over a keyspace of candidates
+
+The keyspace is every string of the given lengths over a charset,
+with each character used at most once (permutations, as in 1.4.py)
+or any number of times (repeat=True). Candidates are numbered in
+lexicographic order (of the charset order) so that the keyspace can be
+split into ranges of indexes, searched in parallel and resumed.
+'''
+
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from math import perm
+
+
+def keyspace_size(charset_size, lengths, repeat=False):
+    '''number of candidates for the given lengths'''
+    if repeat:
+        return sum(charset_size ** length for length in lengths)
+    return sum(perm(charset_size, length) for length in lengths)
+
+
+def _radices(charset_size, length, repeat):
+    # candidate digits are indexes in the charset (repeat=True)
+    # or in the characters not used yet (Lehmer code of a permutation)
+    if repeat:
+        return [charset_size] * length
+    return [charset_size - i for i in range(length)]
+
+
+def _to_digits(index, radices):
+    digits = []
+    for radix in reversed(radices):
+        index, digit = divmod(index, radix)
+        digits.append(digit)
+    return digits[::-1]
+
+
+def _search_range(target, charset, prefix, repeat, length, start, stop):
+    # local index of the candidate of this length hashing to target, or None
+    if length == 0:
+        return 0 if start < stop and hashlib.sha1(prefix).digest() == target else None
+    chars = [charset[i:i + 1] for i in range(len(charset))]
+    radices = _radices(len(chars), length, repeat)
+    digits = _to_digits(start, radices)
+    # available[i]: characters that can be used at position i
+    available = [chars] * length
+    # states[i]: SHA-1 state after the first i characters
+    states = [hashlib.sha1(prefix)] + [None] * (length - 1)
+    # first position of the prefix that has to be computed again
+    changed = 0
+    index = start
+    while index < stop:
+        for i in range(changed, length - 1):
+            d = digits[i]
+            if not repeat:
+                available[i + 1] = available[i][:d] + available[i][d + 1:]
+            states[i + 1] = states[i].copy()
+            states[i + 1].update(available[i][d])
+        last = available[length - 1]
+
+        # only the last character changes, the prefix state is reused
+        copy = states[length - 1].copy
+        first = digits[-1]
+        end = min(len(last), first + stop - index)
+        for d in range(first, end):
+            h = copy()
+            h.update(last[d])
+            if h.digest() == target:
+                return index + d - first
+        index += end - first
+
+        # next prefix
+        digits[-1] = 0
+        i = length - 2
+        while i >= 0:
+            digits[i] += 1
+            if digits[i] < radices[i]:
+                break
+            digits[i] = 0
+            i -= 1
+        changed = max(i, 0)
+    return None
+
+
+def _candidate(charset, repeat, length, index):
+    chars = [charset[i:i + 1] for i in range(len(charset))]
+    candidate = []
+    for digit in _to_digits(index, _radices(len(chars), length, repeat)):
+        available = chars if repeat else [c for c in chars if c not in candidate]
+        candidate.append(available[digit])
+    return b''.join(candidate)
+
+
+def _tasks(charset_size, lengths, repeat, chunk_size, start):
+    # (global index of the first candidate, length, local start, local stop)
+    offset = 0
+    for length in lengths:
+        size = keyspace_size(charset_size, [length], repeat)
+        for local in range(max(0, start - offset), size, chunk_size):
+            yield offset + local, length, local, min(size, local + chunk_size)
+        offset += size
+
+
+def _read_checkpoint(checkpoint, parameters):
+    if checkpoint is None or not os.path.exists(checkpoint):
+        return 0
+    with open(checkpoint) as f:
+        saved = json.load(f)
+    if saved['parameters'] != parameters:
+        raise ValueError('checkpoint %r is for another search' % checkpoint)
+    return saved['next_index']
+
+
+def _write_checkpoint(checkpoint, parameters, next_index):
+    # written then renamed, an interruption never leaves a partial file
+    tmp = checkpoint + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'parameters': parameters, 'next_index': next_index}, f)
+    os.replace(tmp, checkpoint)
+
+
+def search_sha1_preimage(target, charset, lengths, repeat=False, prefix=b'', workers=1,
+                         chunk_size=2 ** 16, checkpoint=None, checkpoint_interval=10,
+                         progress=None):
+    '''first candidate (in keyspace order) whose SHA-1 digest is target,
+    as a dict with keys "password" (bytes) and "index", or None.
+
+    target: raw digest (bytes) or hex string.
+    charset: bytes (or str) of the characters to use, in search order.
+    lengths: candidate lengths, for instance range(1, 9).
+    repeat: whether a character can be used several times.
+    prefix: known bytes hashed before each candidate (a salt for instance),
+            hashed only once.
+    workers: number of processes, each one gets ranges of "chunk_size" candidates.
+    checkpoint: path of a file where progress is saved every
+                "checkpoint_interval" seconds; if it exists the search
+                starts again from there.
+    progress: function called after each range with a dict with keys
+              "done", "total", "seconds" and "rate" (candidates per second).
+    '''
+    if isinstance(target, str):
+        target = bytes.fromhex(target)
+    if isinstance(charset, str):
+        charset = charset.encode()
+    lengths = list(lengths)
+    parameters = {'target': target.hex(), 'charset': charset.hex(),
+                  'lengths': lengths, 'repeat': repeat, 'prefix': prefix.hex()}
+    total = keyspace_size(len(charset), lengths, repeat)
+    start_index = _read_checkpoint(checkpoint, parameters)
+    tasks = _tasks(len(charset), lengths, repeat, chunk_size, start_index)
+
+    # ranges may finish out of order, the checkpoint is the end
+    # of the ranges all done from the start
+    running = deque()
+    finished = set()
+    next_index = start_index
+    start_time = last_checkpoint = time.perf_counter()
+    done = 0
+
+    def range_done(task, found):
+        nonlocal next_index, done, last_checkpoint
+        first, length, local_start, local_stop = task
+        done += (local_stop if found is None else found + 1) - local_start
+        finished.add(first)
+        while running and running[0][0] in finished:
+            finished.discard(running[0][0])
+            next_index = running[0][0] + running[0][3] - running[0][2]
+            running.popleft()
+        now = time.perf_counter()
+        if checkpoint is not None and now - last_checkpoint >= checkpoint_interval:
+            _write_checkpoint(checkpoint, parameters, next_index)
+            last_checkpoint = now
+        if progress is not None:
+            seconds = now - start_time
+            progress({'done': start_index + done, 'total': total, 'seconds': seconds,
+                      'rate': done / seconds if seconds else 0.0})
+        if found is not None:
+            return {'password': _candidate(charset, repeat, length, found),
+                    'index': first + found - local_start}
+        return None
+
+    result = None
+    if workers == 1:
+        for task in tasks:
+            running.append(task)
+            result = range_done(task, _search_range(target, charset, prefix, repeat, *task[1:]))
+            if result is not None:
+                break
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            # a bounded number of ranges in flight, oldest first
+            pending = deque()
+            for task in tasks:
+                running.append(task)
+                pending.append((task, executor.submit(_search_range, target, charset,
+                                                      prefix, repeat, *task[1:])))
+                if len(pending) >= 2 * workers:
+                    task, future = pending.popleft()
+                    result = range_done(task, future.result())
+                    if result is not None:
+                        break
+            while result is None and pending:
+                task, future = pending.popleft()
+                result = range_done(task, future.result())
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    if checkpoint is not None:
+        # a search resumed after success finds the same password again
+        _write_checkpoint(checkpoint, parameters, total if result is None else result['index'])
+    return result
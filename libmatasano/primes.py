@@ -0,0 +1,105 @@
+'''prime numbers: primality test and factorization'''
+
+import math
+import secrets
+
+
+def _sieve(limit):
+    '''primes below limit'''
+    is_prime = bytearray([1]) * limit
+    is_prime[:2] = b'\x00\x00'
+    for i in range(2, math.isqrt(limit - 1) + 1):
+        if is_prime[i]:
+            is_prime[i * i::i] = bytes(len(range(i * i, limit, i)))
+    return [i for i in range(limit) if is_prime[i]]
+
+
+SMALL_PRIMES = _sieve(1000)
+
+# Miller-Rabin with these bases never fails below _DETERMINISTIC_LIMIT
+_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+_DETERMINISTIC_LIMIT = 3317044064679887385961981
+
+
+def is_probable_prime(n, rounds=16):
+    '''Miller-Rabin test, deterministic below 3.3 * 10**24 (random bases
+    above, a composite passes with probability at most 4**-rounds)'''
+    if n < 2:
+        return False
+    for prime in SMALL_PRIMES:
+        if n % prime == 0:
+            return n == prime
+    if n < SMALL_PRIMES[-1] ** 2:
+        return True
+    s = ((n - 1) & (1 - n)).bit_length() - 1
+    d = (n - 1) >> s
+    if n < _DETERMINISTIC_LIMIT:
+        bases = _BASES
+    else:
+        bases = [secrets.randbelow(n - 3) + 2 for _ in range(rounds)]
+    for a in bases:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _pollard_brent(n):
+    '''a non-trivial factor of the odd composite n'''
+    while True:
+        y = secrets.randbelow(n - 1) + 1
+        c = secrets.randbelow(n - 1) + 1
+        g = r = q = 1
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                saved = y
+                # one gcd for a batch of 128 differences
+                for _ in range(min(128, r - k)):
+                    y = (y * y + c) % n
+                    q = q * abs(x - y) % n
+                g = math.gcd(q, n)
+                k += 128
+            r *= 2
+        if g == n:
+            # the batch went too far, redo it one step at a time
+            g = 1
+            while g == 1:
+                saved = (saved * saved + c) % n
+                g = math.gcd(abs(x - saved), n)
+        if g != n:
+            return g
+
+
+def factorize(n):
+    '''{prime: exponent} for n >= 1 (trial division, then Pollard-Brent rho)'''
+    factors = {}
+    for prime in SMALL_PRIMES:
+        if n % prime == 0:
+            exponent = 0
+            while n % prime == 0:
+                n //= prime
+                exponent += 1
+            factors[prime] = exponent
+    composites = [n] if n > 1 else []
+    while composites:
+        n = composites.pop()
+        if is_probable_prime(n):
+            factors[n] = factors.get(n, 0) + 1
+            continue
+        root = math.isqrt(n)
+        if root * root == n:
+            composites += [root, root]
+            continue
+        factor = _pollard_brent(n)
+        composites += [factor, n // factor]
+    return dict(sorted(factors.items()))
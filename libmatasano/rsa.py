@@ -0,0 +1,172 @@
+'''RSA: unconcealed messages
+
+A message m is unconcealed by the exponent e if m**e == m (mod n). For
+n = p*q there are (1 + gcd(e-1, p-1)) * (1 + gcd(e-1, q-1)) of them, so
+the exponents can be grouped by the two gcds. Both only depend on e
+modulo each prime power of lcm(p-1, q-1): the number of exponents of a
+group is a product of local counts, and their sum comes from
+inclusion-exclusion over arithmetic progressions (CRT), without
+enumerating the exponents below phi.
+'''
+
+import math
+from itertools import product
+
+from . import optional
+from .primes import factorize
+
+
+def unconcealed_messages(e, p, q):
+    '''number of messages m < p*q with m**e == m (mod p*q), p != q primes'''
+    return (1 + math.gcd(e - 1, p - 1)) * (1 + math.gcd(e - 1, q - 1))
+
+
+def _prime_powers(p, q):
+    # [(prime, exponent in p-1, exponent in q-1)] for the primes of phi
+    factors_p = factorize(p - 1)
+    factors_q = factorize(q - 1)
+    return [(prime, factors_p.get(prime, 0), factors_q.get(prime, 0))
+            for prime in sorted(set(factors_p) | set(factors_q))]
+
+
+def _local_count(prime, exponent, t):
+    # residues x mod prime**exponent, x coprime with prime,
+    # with min(valuation of x-1, exponent) == t
+    if t == exponent:
+        return 1
+    if t > 0:
+        return prime ** (exponent - t - 1) * (prime - 1)
+    return prime ** (exponent - 1) * (prime - 2)
+
+
+def _local_terms(prime, exponent, t):
+    # the same residues as signed congruences [(sign, modulus, residue)]
+    if t == 0:
+        return [(1, 1, 0), (-1, prime, 0), (-1, prime, 1)]
+    terms = [(1, prime ** t, 1)]
+    if t < exponent:
+        terms.append((-1, prime ** (t + 1), 1))
+    return terms
+
+
+def _class_gcds(powers, ts):
+    g_p = g_q = 1
+    for (prime, alpha, beta), t in zip(powers, ts):
+        g_p *= prime ** min(t, alpha)
+        g_q *= prime ** min(t, beta)
+    return g_p, g_q
+
+
+def _class_count(powers, ts, periods):
+    count = periods
+    for (prime, alpha, beta), t in zip(powers, ts):
+        count *= _local_count(prime, max(alpha, beta), t)
+    return count
+
+
+def _class_sum(powers, ts, phi):
+    # sum of the exponents 0 <= e < phi of a class: every combination of
+    # local terms is one arithmetic progression, merged with the CRT
+    progressions = [(1, 1, 0)]
+    for (prime, alpha, beta), t in zip(powers, ts):
+        progressions = [
+            (sign * local_sign, modulus * local_modulus,
+             residue + modulus * ((local_residue - residue)
+                                  * pow(modulus, -1, local_modulus) % local_modulus))
+            for sign, modulus, residue in progressions
+            for local_sign, local_modulus, local_residue
+            in _local_terms(prime, max(alpha, beta), t)]
+    total = 0
+    for sign, modulus, residue in progressions:
+        k = phi // modulus
+        total += sign * (k * residue + modulus * k * (k - 1) // 2)
+    return total
+
+
+def unconcealed_classes(p, q):
+    '''{(gcd(e-1, p-1), gcd(e-1, q-1)): number of exponents} for the
+    exponents 1 < e < phi coprime with phi'''
+    powers = _prime_powers(p, q)
+    periods = math.gcd(p - 1, q - 1)
+    classes = {}
+    for ts in product(*[range(max(alpha, beta) + 1) for _, alpha, beta in powers]):
+        if any(prime == 2 and t == 0 for (prime, _, _), t in zip(powers, ts)):
+            continue
+        gcds = _class_gcds(powers, ts)
+        classes[gcds] = classes.get(gcds, 0) + _class_count(powers, ts, periods)
+    # e = 1 is not an exponent
+    classes[p - 1, q - 1] -= 1
+    return {gcds: count for gcds, count in classes.items() if count}
+
+
+def _min_brute_force(p, q, chunk_size):
+    phi = (p - 1) * (q - 1)
+    numpy = optional.numpy()
+    if numpy is not None and phi * chunk_size >= 2 ** 63:
+        numpy = None
+    best = None
+    nb_exponents = total = 0
+    gcds = None
+    for start in range(2, phi, chunk_size):
+        stop = min(start + chunk_size, phi)
+        if numpy is not None:
+            e = numpy.arange(start, stop, dtype=numpy.int64)
+            e = e[numpy.gcd(e, phi) == 1]
+            g_p = numpy.gcd(e - 1, p - 1)
+            g_q = numpy.gcd(e - 1, q - 1)
+            counts = (1 + g_p) * (1 + g_q)
+            if not len(counts):
+                continue
+            low = int(counts.min())
+            optimal = counts == low
+            chunk = (int(optimal.sum()), int(e[optimal].sum()))
+            first = optimal.argmax()
+            chunk_gcds = (int(g_p[first]), int(g_q[first]))
+        else:
+            low = None
+            for e in range(start, stop):
+                if math.gcd(e, phi) != 1:
+                    continue
+                count = unconcealed_messages(e, p, q)
+                if low is None or count < low:
+                    low, chunk, chunk_gcds = count, (1, e), \
+                        (math.gcd(e - 1, p - 1), math.gcd(e - 1, q - 1))
+                elif count == low:
+                    chunk = (chunk[0] + 1, chunk[1] + e)
+            if low is None:
+                continue
+        if best is None or low < best:
+            best, (nb_exponents, total), gcds = low, chunk, chunk_gcds
+        elif low == best:
+            nb_exponents += chunk[0]
+            total += chunk[1]
+    return {'unconcealed': best, 'gcds': gcds,
+            'nb_exponents': nb_exponents, 'sum': total}
+
+
+def min_unconcealed_exponents(p, q, brute_force=False, chunk_size=2 ** 20):
+    '''exponents 1 < e < phi coprime with phi that unconceal the fewest
+    messages: {'unconcealed': number of messages, 'gcds': (gcd(e-1, p-1),
+    gcd(e-1, q-1)), 'nb_exponents': number of such e, 'sum': their sum}
+
+    brute_force=True tries every e instead (with NumPy if available,
+    chunk_size exponents at a time), to check small inputs.
+    '''
+    if brute_force:
+        return _min_brute_force(p, q, chunk_size)
+    powers = _prime_powers(p, q)
+    phi = (p - 1) * (q - 1)
+    # both gcds grow with each local valuation, so the best class takes
+    # the smallest possible one everywhere (e is odd when phi is even)
+    ts = [1 if prime == 2 else 0 for prime, _, _ in powers]
+    gcds = _class_gcds(powers, ts)
+    nb_exponents = _class_count(powers, ts, math.gcd(p - 1, q - 1))
+    total = _class_sum(powers, ts, phi)
+    if gcds == (p - 1, q - 1):
+        # e = 1 is not an exponent
+        nb_exponents -= 1
+        total -= 1
+    if not nb_exponents:
+        return {'unconcealed': None, 'gcds': None, 'nb_exponents': 0, 'sum': 0}
+    return {'unconcealed': (1 + gcds[0]) * (1 + gcds[1]), 'gcds': gcds,
+            'nb_exponents': nb_exponents, 'sum': total}
@@ -0,0 +1,198 @@
+'''SHA-1 and length extension of SHA-1 MACs'''
+
+import struct
+
+
+# following RFC 3174
+# https://tools.ietf.org/html/rfc3174
+
+# we are always in big-endian form in SHA1
+# (Section 2.c: "The least significant four bits of the integer are
+# represented by the right-most hex digit of the word representation")
+
+# to use as a bit mask for reduction modulo 2^32
+_MAX_WORD = 0xFFFFFFFF
+
+# Section 5: the constant K(t) for each of the four phases of 20 rounds
+_SHA1_K = (0x5A827999, 0x6ED9EBA1, 0x8F1BBCDC, 0xCA62C1D6)
+
+_SHA1_INITIAL_STATE = (0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476, 0xC3D2E1F0)
+
+_sha1_block = struct.Struct('>16I')
+
+
+def _sha1_compress(state, block):
+    '''processes one 64-byte block (Section 6.1), returns the new state'''
+    M = _MAX_WORD
+    W = list(_sha1_block.unpack(block))
+    for t in range(16, 80):
+        X = W[t - 3] ^ W[t - 8] ^ W[t - 14] ^ W[t - 16]
+        # S^1 (circular left shift)
+        W.append(((X << 1) | (X >> 31)) & M)
+
+    H0, H1, H2, H3, H4 = state
+    A, B, C, D, E = state
+    K0, K1, K2, K3 = _SHA1_K
+
+    # the four phases, each with its own f(t;B,C,D) and K(t);
+    # S^5(A) is ((A << 5) | (A >> 27)) and S^30(B) is ((B << 30) | (B >> 2))
+    for t in range(0, 20):
+        TEMP = ((A << 5) | (A >> 27)) + ((B & C) | (~B & D)) + E + W[t] + K0
+        E, D, C, B, A = D, C, ((B << 30) | (B >> 2)) & M, A, TEMP & M
+    for t in range(20, 40):
+        TEMP = ((A << 5) | (A >> 27)) + (B ^ C ^ D) + E + W[t] + K1
+        E, D, C, B, A = D, C, ((B << 30) | (B >> 2)) & M, A, TEMP & M
+    for t in range(40, 60):
+        TEMP = ((A << 5) | (A >> 27)) + ((B & C) | (B & D) | (C & D)) + E + W[t] + K2
+        E, D, C, B, A = D, C, ((B << 30) | (B >> 2)) & M, A, TEMP & M
+    for t in range(60, 80):
+        TEMP = ((A << 5) | (A >> 27)) + (B ^ C ^ D) + E + W[t] + K3
+        E, D, C, B, A = D, C, ((B << 30) | (B >> 2)) & M, A, TEMP & M
+
+    return ((H0 + A) & M, (H1 + B) & M, (H2 + C) & M, (H3 + D) & M, (H4 + E) & M)
+
+
+def sha1_padding(length):
+    '''Section 4: padding for a message of "length" bytes'''
+    # we must append a "1" bit.
+    # since we are always working with bytes
+    # the appended bit will always be at the beginning of the next byte.
+    # then zeroes until we are 8 bytes short of a multiple of 64 bytes
+    # and the message length in bits on those 8 bytes
+    nb_zeroes = -(length + 1 + 8) % 64
+    return (bytes([0b10000000])
+            + b'\x00' * nb_zeroes
+            + (length * 8).to_bytes(8, byteorder='big'))
+
+
+class SHA1:
+    '''incremental SHA-1, with the same interface as hashlib.sha1
+
+    The internal state (H0, ..., H4) can be set and read (the "midstate"):
+    "length" is the number of bytes already hashed into "state",
+    it is used in the final padding.
+    '''
+
+    name = 'sha1'
+    digest_size = 20
+    block_size = 64
+
+    def __init__(self, data=b'', state=None, length=0):
+        if state is None:
+            state = _SHA1_INITIAL_STATE
+        else:
+            state = tuple(state)
+            if len(state) != 5 or not all(isinstance(x, int) for x in state):
+                raise ValueError('state must be a tuple of 5 integers')
+        self._state = state
+        self._length = length
+        self._buffer = b''
+        self.update(data)
+
+    @classmethod
+    def from_digest(cls, digest, length):
+        '''SHA-1 object in the state it was after producing "digest"
+        for a message which was "length" bytes long after padding'''
+        return cls(state=struct.unpack('>5I', digest), length=length)
+
+    def update(self, data):
+        data = memoryview(data).cast('B')
+        start = 0
+        if self._buffer:
+            start = min(len(data), self.block_size - len(self._buffer))
+            self._buffer += data[:start]
+            if len(self._buffer) < self.block_size:
+                return
+            self._state = _sha1_compress(self._state, self._buffer)
+            self._length += self.block_size
+            self._buffer = b''
+
+        state = self._state
+        end = start + (len(data) - start) // self.block_size * self.block_size
+        for i in range(start, end, self.block_size):
+            state = _sha1_compress(state, data[i:i + self.block_size])
+        self._state = state
+        self._length += end - start
+        self._buffer = bytes(data[end:])
+
+    def copy(self):
+        other = SHA1.__new__(SHA1)
+        other._state = self._state
+        other._length = self._length
+        other._buffer = self._buffer
+        return other
+
+    def export_state(self):
+        '''(state, length): the midstate, only at a block boundary'''
+        if self._buffer:
+            raise ValueError('%d bytes are not processed yet'
+                             % len(self._buffer))
+        return self._state, self._length
+
+    def digest(self):
+        length = self._length + len(self._buffer)
+        final = self._buffer + sha1_padding(length)
+        state = self._state
+        for i in range(0, len(final), self.block_size):
+            state = _sha1_compress(state, final[i:i + self.block_size])
+        return struct.pack('>5I', *state)
+
+    def hexdigest(self):
+        return self.digest().hex()
+
+
+def sha1(msg, state=None):
+    '''SHA-1 digest of msg,
+    starting from "state" (H0, ..., H4) if given (used for SHA-1 cloning)'''
+    return SHA1(msg, state=state).digest()
+
+
+# from challenge 29: length extension on a secret-prefix SHA-1 MAC
+# (mac = sha1(key + message))
+
+def sha1_length_extension(mac, message, suffix, key_lengths):
+    '''forged (key_length, message, mac) for every candidate key length,
+    where the forged message is message + glue padding + suffix'''
+    # the known MAC is the internal state after hashing the padded message,
+    # it is loaded only once
+    state = struct.unpack('>5I', mac)
+    # the forged MAC only depends on the padded length of key + message,
+    # which is the same for up to 64 consecutive key lengths
+    forged_macs = dict()
+    for key_length in key_lengths:
+        glue = sha1_padding(key_length + len(message))
+        padded_length = key_length + len(message) + len(glue)
+        if padded_length not in forged_macs:
+            forged_macs[padded_length] = SHA1(suffix, state=state,
+                                              length=padded_length).digest()
+        yield (key_length, message + glue + suffix, forged_macs[padded_length])
+
+
+def forge_sha1_mac(mac, message, suffix, verifier, key_lengths=range(65),
+                   workers=1):
+    '''first forgery (key_length, message, mac) accepted by
+    verifier(message, mac), None if none is.
+
+    With workers > 1 the verifier is called from a thread pool
+    (useful when it is a remote oracle), remaining calls are cancelled
+    as soon as one forgery is accepted.'''
+    forgeries = sha1_length_extension(mac, message, suffix, key_lengths)
+    if workers == 1:
+        for forgery in forgeries:
+            if verifier(forgery[1], forgery[2]):
+                return forgery
+        return None
+
+    # concurrent.futures is slow to import, only pay for it when needed
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {executor.submit(verifier, forgery[1], forgery[2]): forgery
+                   for forgery in forgeries}
+        for future in as_completed(futures):
+            if future.result():
+                return futures[future]
+        return None
+    finally:
+        executor.shutdown(cancel_futures=True)
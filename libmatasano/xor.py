@@ -0,0 +1,122 @@
+'''XOR of byte strings'''
+
+from functools import lru_cache
+from itertools import cycle, zip_longest
+
+from . import optional
+
+
+# below this size, the overhead of creating NumPy arrays
+# is bigger than the gain
+NUMPY_XOR_MIN_SIZE = 2 ** 12
+
+
+@lru_cache(maxsize=256)
+def _single_byte_xor_table(k):
+    # to be used with bytes.translate
+    return bytes(x ^ k for x in range(256))
+
+
+def _as_bytes_view(x):
+    try:
+        return memoryview(x).cast('B')
+    except TypeError:
+        return None
+
+
+def _bxor_iterables(a, b, longest, repeat):
+    # generic (slow) version for operands that are not buffers
+    # (lists of integers, generators ...)
+    if repeat:
+        b = cycle(b)
+        longest = False
+    if longest:
+        return bytes([x ^ y for (x, y) in zip_longest(a, b, fillvalue=0)])
+    else:
+        return bytes([x ^ y for (x, y) in zip(a, b)])
+
+
+def bxor(a, b, longest=True, out=None, repeat=False):
+    '''XOR of a and b (bytes, bytearray, memoryview, mmap ...)
+
+    longest: if True the result is as long as the longest operand
+             (the shortest one is padded with zeroes),
+             otherwise it is as long as the shortest operand.
+    repeat: b is repeated to the length of a (repeating-key XOR).
+            If b is an integer it is used as a single-byte key.
+    out: writable buffer with the length of the result,
+         the result is written in it and "out" is returned.
+    '''
+    if isinstance(b, int):
+        b = bytes([b])
+        repeat = True
+
+    a_view = _as_bytes_view(a)
+    b_view = _as_bytes_view(b)
+    if a_view is None or b_view is None:
+        result = _bxor_iterables(a, b, longest, repeat)
+    elif repeat and len(b_view) == 1:
+        # single-byte key: a lookup table does all the work
+        result = bytes(a_view).translate(_single_byte_xor_table(b_view[0]))
+    else:
+        if repeat:
+            if len(b_view) == 0:
+                raise ValueError('cannot repeat an empty key')
+            # key repetition is done by bytes multiplication (in C)
+            length = len(a_view)
+            b_view = memoryview((bytes(b_view) * (length // len(b_view) + 1))[:length])
+        elif not longest:
+            length = min(len(a_view), len(b_view))
+            a_view = a_view[:length]
+            b_view = b_view[:length]
+        else:
+            length = max(len(a_view), len(b_view))
+
+        if length >= NUMPY_XOR_MIN_SIZE:
+            numpy = optional.numpy()
+            if numpy is not None:
+                return _bxor_numpy(numpy, a_view, b_view, length, out)
+
+        # using little-endian ordering,
+        # the shortest operand is naturally padded with zeroes on its end
+        result = (int.from_bytes(a_view, byteorder='little')
+                  ^ int.from_bytes(b_view, byteorder='little')
+                  ).to_bytes(length, byteorder='little')
+
+    if out is None:
+        return result
+    out_view = memoryview(out).cast('B')
+    if len(out_view) != len(result):
+        raise ValueError('out has length %d instead of %d'
+                         % (len(out_view), len(result)))
+    out_view[:] = result
+    return out
+
+
+def _bxor_numpy(numpy, a_view, b_view, length, out):
+    x = numpy.frombuffer(a_view, dtype=numpy.uint8)
+    y = numpy.frombuffer(b_view, dtype=numpy.uint8)
+    if len(x) < len(y):
+        x, y = y, x
+
+    if out is None:
+        result = numpy.empty(length, dtype=numpy.uint8)
+    else:
+        result = numpy.frombuffer(out, dtype=numpy.uint8)
+        if len(result) != length:
+            raise ValueError('out has length %d instead of %d'
+                             % (len(result), length))
+
+    numpy.bitwise_xor(x[:len(y)], y, out=result[:len(y)])
+    # padding the shortest operand with zeroes means copying the longest one
+    result[len(y):] = x[len(y):]
+    return result.tobytes() if out is None else out
+
+
+def hamming_distance(a, b):
+    '''number of differing bits between a and b (of the same length)'''
+    if len(a) != len(b):
+        raise ValueError('operands have different lengths (%d and %d)'
+                         % (len(a), len(b)))
+    return (int.from_bytes(a, byteorder='little')
+            ^ int.from_bytes(b, byteorder='little')).bit_count()
@@ -0,0 +1,673 @@
+'''tests for libmatasano (run with "python3 -m pytest")'''
+
+import base64
+import hashlib
+import io
+import math
+import os
+import random
+import subprocess
+import sys
+from itertools import islice, permutations, product, zip_longest
+from random import randint
+
+import pytest
+
+import libmatasano
+from libmatasano import optional
+from libmatasano import (
+    BLOCK_SIZE, PaddingError, bxor,
+    encrypt_aes_128_ecb, decrypt_aes_128_ecb,
+    encrypt_aes_128_cbc, decrypt_aes_128_cbc,
+    AES128CBCEncryptor, AES128CBCDecryptor,
+    transform_aes_128_ctr, cbc_xor, detect_ecb,
+    MT19937, MT19937_32, clone_mt19937, clone_mt19937_from_bytes,
+    SHA1, sha1, sha1_padding, forge_sha1_mac,
+)
+
+
+@pytest.fixture(params=[True, False], ids=['numpy', 'pure-python'])
+def use_numpy(request, monkeypatch):
+    if request.param and optional.numpy() is None:
+        pytest.skip('NumPy is not installed')
+    monkeypatch.setattr(optional, 'USE_NUMPY', request.param)
+
+
+def test_import_is_lazy():
+    code = ('import sys, libmatasano; '
+            'print(sorted(m for m in ("cryptography", "IPython", "numpy") '
+            'if m in sys.modules))')
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                            text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert result.stdout.strip() == '[]'
+
+
+# XOR
+
+def _reference_bxor(a, b, longest=True):
+    if longest:
+        return bytes([x ^ y for (x, y) in zip_longest(a, b, fillvalue=0)])
+    return bytes([x ^ y for (x, y) in zip(a, b)])
+
+
+@pytest.mark.parametrize('length_a, length_b',
+                         [(0, 0), (0, 5), (16, 16), (17, 3), (5000, 9000)])
+def test_bxor(use_numpy, length_a, length_b):
+    a = os.urandom(length_a)
+    b = os.urandom(length_b)
+    for longest in (True, False):
+        expected = _reference_bxor(a, b, longest)
+        assert bxor(a, b, longest) == expected
+        assert bxor(bytearray(a), memoryview(b), longest) == expected
+        out = bytearray(len(expected))
+        assert bxor(a, b, longest, out=out) is out
+        assert out == expected
+
+
+def test_bxor_repeating_key():
+    msg = b"Burning 'em, if you ain't quick and nimble\nI go crazy when I hear a cymbal"
+    assert bxor(msg, b'ICE', repeat=True).hex() == (
+        '0b3637272a2b2e63622c2e69692a23693a2a3c6324202d623d63343c2a26226324272765272a282b2f20'
+        '430a652e2c652a3124333a653e2b2027630c692b20283165286326302e27282f')
+    assert bxor(msg, 0x42) == bytes(x ^ 0x42 for x in msg)
+
+
+@pytest.mark.parametrize('scoring', ['letters', 'frequency_rank', 'chi_squared'])
+def test_rank_single_byte_xor_keys(use_numpy, scoring):
+    msg = b"Cooking MC's like a pound of bacon, and the quick brown fox jumps over it"
+    ctxt = bxor(msg, 0x58)
+    best = libmatasano.rank_single_byte_xor_keys(ctxt, scoring, top_k=3)
+    assert len(best) == 3
+    assert best[0]['key'] == 0x58
+    assert best[0]['score'] > best[1]['score'] >= best[2]['score']
+
+    # the score of a key is the score of the plaintext it gives
+    scores = libmatasano.single_byte_xor_scores(ctxt, scoring)
+    for key in (0, 0x58, 0xff):
+        assert scores[key] == pytest.approx(
+            libmatasano.single_byte_xor_scores(bxor(ctxt, key), scoring)[0])
+
+
+def test_single_byte_xor_forbidden_bytes(use_numpy):
+    msg = b'all lowercase text without anything else '
+    ctxt = bxor(msg, 0x20)
+    # case swapping keys also give letters, but then the space becomes a null byte
+    scores = libmatasano.single_byte_xor_scores(ctxt, 'letters', forbidden=range(32))
+    assert scores[0x20] is not None
+    assert scores[0x00] is None
+    best = libmatasano.rank_single_byte_xor_keys(ctxt, 'letters', 256, range(32))
+    assert len(best) == sum(score is not None for score in scores)
+    assert libmatasano.attack_single_byte_xor(ctxt)['message'] == msg
+
+
+def test_detect_single_byte_xor(use_numpy, tmp_path):
+    lines = [os.urandom(30).hex() for _ in range(500)]
+    lines[321] = bxor(b'Now that the party is jumping\n', 0x35).hex()
+    lines[10] = 'abc'  # odd number of digits
+    lines[11] = ''
+    path = tmp_path / 'lines.txt'
+    path.write_text('\n'.join(lines))
+
+    stats = {}
+    best = libmatasano.detect_single_byte_xor(str(path), top_k=3, batch_lines=64,
+                                              chunk_size=1000, stats=stats)
+    assert best[0] == {'line': 322, 'key': 0x35, 'score': best[0]['score'],
+                       'message': b'Now that the party is jumping\n'}
+    assert stats['lines'] == 500
+
+    with open(path, 'rb') as f:
+        assert libmatasano.detect_single_byte_xor(f, top_k=3, workers=2,
+                                                  batch_lines=100) == best
+
+
+_TEXT = (
+    b"It was the best of times, it was the worst of times, it was the age of wisdom, "
+    b"it was the age of foolishness, it was the epoch of belief, it was the epoch of "
+    b"incredulity, it was the season of Light, it was the season of Darkness, it was "
+    b"the spring of hope, it was the winter of despair, we had everything before us, "
+    b"we had nothing before us, we were all going direct to Heaven, we were all going "
+    b"direct the other way - in short, the period was so far like the present period, "
+    b"that some of its noisiest authorities insisted on its being received, for good "
+    b"or for evil, in the superlative degree of comparison only. There were a king "
+    b"with a large jaw and a queen with a plain face, on the throne of England; there "
+    b"were a king with a large jaw and a queen with a fair face, on the throne of "
+    b"France. In both countries it was clearer than crystal to the lords of the State "
+    b"preserves of loaves and fishes, that things in general were settled for ever.")
+
+
+@pytest.mark.parametrize('scoring', ['frequency_rank', 'chi_squared'])
+def test_break_repeating_key_xor(use_numpy, scoring):
+    key = b'Vanilla'
+    ctxt = bxor(_TEXT, key, repeat=True)
+    results = libmatasano.break_repeating_key_xor(ctxt, range(2, 12), scoring, top_k=3)
+    assert len(results) == 3
+    assert results[0]['keysize'] == 7
+    assert results[0]['key'] == key
+    assert results[0]['score'] > results[1]['score'] >= results[2]['score']
+
+
+def test_hamming_distance():
+    assert libmatasano.hamming_distance(b'this is a test', b'wokka wokka!!!') == 37
+    with pytest.raises(ValueError):
+        libmatasano.hamming_distance(b'a', b'bc')
+
+
+def test_estimate_keysizes(use_numpy):
+    key = b'Terminator X: Bring the noise'
+    ctxt = bxor(_TEXT * 5, key, repeat=True)
+    candidates = libmatasano.estimate_keysizes(ctxt, range(2, 41), top_k=3)
+    assert candidates[0]['keysize'] == len(key)
+    assert candidates[0]['confidence'] > candidates[1]['confidence'] > 0
+
+    distance = sum(bin(x ^ y).count('1') for (x, y) in zip(ctxt, ctxt[len(key):]))
+    assert candidates[0]['distance'] == pytest.approx(distance / (len(ctxt) - len(key)))
+
+    results = libmatasano.break_repeating_key_xor(ctxt, candidates)
+    assert results[0]['key'] == key
+
+
+def test_break_repeating_key_xor_workers_and_early_stop():
+    key = os.urandom(7)
+    ctxt = bxor(_TEXT, key, repeat=True)
+    serial = libmatasano.break_repeating_key_xor(ctxt, range(1, 16), top_k=15)
+    parallel = libmatasano.break_repeating_key_xor(ctxt, range(1, 16), top_k=15, workers=2)
+    assert serial == parallel
+    assert serial[0]['key'] == key
+
+    # 7 clearly ahead of 3, the other keysizes are not even tried
+    stopped = libmatasano.break_repeating_key_xor(ctxt, [7, 3, 14, 21], top_k=5,
+                                                  stop_margin=1)
+    assert [r['keysize'] for r in stopped] == [7, 3]
+
+
+def test_many_time_pad(use_numpy):
+    keystream = os.urandom(200)
+    sentences = _TEXT.split(b', ')
+    ctxts = [bxor(s, keystream, longest=False) for s in sentences]
+
+    pad = libmatasano.ManyTimePad(ctxts[:10])
+    pad.add(ctxts[10:])
+    pad.add([])
+    assert len(pad) == len(sentences)
+    key, confidence = pad.key()
+    assert len(key) == len(confidence) == max(len(s) for s in sentences)
+
+    # positions where enough sentences agree on a space are right
+    reliable = [j for j in range(20) if confidence[j] > 0.8]
+    assert len(reliable) > 10
+    assert all(key[j] == keystream[j] for j in reliable)
+    assert pad.decrypt(ctxts[0])[:20] == bxor(ctxts[0], key)[:20]
+
+
+# password search
+
+@pytest.mark.parametrize('repeat', [False, True])
+def test_search_sha1_preimage(repeat):
+    charset = b'abcde'
+    if repeat:
+        candidates = [bytes(c) for n in range(4) for c in product(charset, repeat=n)]
+    else:
+        candidates = [bytes(c) for n in range(4) for c in permutations(charset, n)]
+    assert libmatasano.keyspace_size(5, range(4), repeat) == len(candidates)
+
+    for index in [0, 1, 30, len(candidates) - 1]:
+        target = hashlib.sha1(b'salt' + candidates[index]).hexdigest()
+        for workers in (1, 2):
+            result = libmatasano.search_sha1_preimage(
+                target, charset, range(4), repeat, prefix=b'salt',
+                workers=workers, chunk_size=7)
+            assert result == {'password': candidates[index], 'index': index}
+    assert libmatasano.search_sha1_preimage(bytes(20), charset, range(4), repeat) is None
+
+
+def test_search_sha1_preimage_resume(tmp_path):
+    checkpoint = str(tmp_path / 'search.json')
+    target = hashlib.sha1(b'edcba').digest()
+
+    def interrupt(progress):
+        if progress['done'] >= 50:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        libmatasano.search_sha1_preimage(target, b'abcde', [5], chunk_size=10,
+                                         checkpoint=checkpoint, checkpoint_interval=0,
+                                         progress=interrupt)
+    progress = []
+    result = libmatasano.search_sha1_preimage(target, b'abcde', [5], chunk_size=10,
+                                              checkpoint=checkpoint, progress=progress.append)
+    assert result == {'password': b'edcba', 'index': 119}
+    # the first ranges were not searched again
+    assert progress[0]['done'] == 50 + 10
+
+    with pytest.raises(ValueError):
+        libmatasano.search_sha1_preimage(target, b'abcdef', [5], checkpoint=checkpoint)
+
+
+# BAC keys
+
+def test_bac_keys():
+    # worked example of ICAO 9303 part 11
+    assert libmatasano.mrz_check_digit('L898902C<') == '3'
+    assert libmatasano.mrz_check_digit('690806') == '1'
+    assert libmatasano.mrz_check_digit('940623') == '6'
+    mrz_information = 'L898902C<369080619406236'
+    assert libmatasano.bac_keys([mrz_information, mrz_information.encode()]) == [
+        bytes.fromhex('AB94FDECF2674FDFB9B391F85D7F76F2')] * 2
+    assert libmatasano.bac_keys([mrz_information], counter=2) == [
+        bytes.fromhex('7962D9ECE03D1ACD4C76089DCE131543')]
+
+    key = libmatasano.adjust_parity(bytes(range(256)))
+    assert all(bin(b).count('1') % 2 == 1 for b in key)
+    assert bytes(b & 0xFE for b in key) == bytes(b & 0xFE for b in range(256))
+
+
+def test_bac_decrypt_first_block():
+    numpy = optional.numpy()
+    if numpy is None:
+        pytest.skip('NumPy is not installed')
+    from libmatasano.bac import _decrypt_block_numpy
+
+    keys = os.urandom(16 * 50)
+    block = os.urandom(16)
+    plain = _decrypt_block_numpy(numpy, numpy.frombuffer(keys, dtype=numpy.uint8)
+                                 .reshape(-1, 16), block)
+    assert [row.tobytes() for row in plain] == [
+        libmatasano.decrypt_aes_128_block(block, keys[i:i + 16]) for i in range(0, len(keys), 16)]
+
+
+def test_search_bac_key(use_numpy):
+    import datetime
+
+    mrz_information = 'L898902C<369080619406236'
+    key = libmatasano.bac_keys([mrz_information])[0]
+    iv = os.urandom(16)
+    ciphertext = encrypt_aes_128_cbc(_TEXT[:100], iv, key)
+
+    births = list(libmatasano.mrz_dates(datetime.date(1969, 1, 1), datetime.date(1969, 12, 31)))
+    for workers in (1, 2):
+        result = libmatasano.search_bac_key(ciphertext, 'L898902C<3', births, '9406??' + '?',
+                                            iv=iv, workers=workers, chunk_size=5000)
+        assert result['mrz_information'] == mrz_information
+        assert result['key'] == key
+
+    # a wrong known check digit rules the field out
+    assert libmatasano.search_bac_key(ciphertext, 'L898902C<4', '6908061', '9406236',
+                                      iv=iv) is None
+    result = libmatasano.search_bac_key(ciphertext, 'L898902C<3', '690806?', '940623?', iv=iv,
+                                        plausible=lambda block: block == _TEXT[:16])
+    assert result['index'] == 0
+
+
+# AES
+
+def test_ecb_round_trip():
+    for _ in range(4):
+        key = os.urandom(16)
+        msg = os.urandom(randint(8, 18))
+        ctxt = encrypt_aes_128_ecb(msg, key)
+        assert decrypt_aes_128_ecb(ctxt, key) == msg
+
+
+def test_cbc_round_trip():
+    for _ in range(4):
+        key = os.urandom(16)
+        iv = os.urandom(16)
+        msg = os.urandom(randint(8, 48))
+        ctxt = encrypt_aes_128_cbc(msg, iv, key)
+        assert decrypt_aes_128_cbc(ctxt, iv, key) == msg
+
+
+def test_cbc_streaming():
+    key = os.urandom(16)
+    iv = os.urandom(16)
+    msg = os.urandom(1000)
+    ctxt = encrypt_aes_128_cbc(msg, iv, key)
+
+    encryptor = AES128CBCEncryptor(iv, key)
+    decryptor = AES128CBCDecryptor(iv, key)
+    result_ctxt = b''
+    result_msg = b''
+    position = 0
+    while position < len(msg):
+        step = randint(1, 40)
+        result_ctxt += encryptor.update(msg[position:position + step])
+        result_msg += decryptor.update(ctxt[position:position + step])
+        position += step
+    result_ctxt += encryptor.finalize()
+    result_msg += decryptor.update(ctxt[position:]) + decryptor.finalize()
+    assert result_ctxt == ctxt
+    assert result_msg == msg
+
+    dst = io.BytesIO()
+    AES128CBCDecryptor(iv, key).process_file(io.BytesIO(ctxt), dst, chunk_size=48)
+    assert dst.getvalue() == msg
+
+
+def test_cbc_bad_length():
+    with pytest.raises(PaddingError):
+        decrypt_aes_128_cbc(os.urandom(20), os.urandom(16), os.urandom(16))
+
+
+def test_ctr():
+    # challenge 18
+    ctxt = base64.b64decode('L77na/nrFsKvynd6HzOoG7GHTLXsTVu9qvY/2syLXzhPweyyMTJULu/6/kXX0KSvoOLSFQ==')
+    assert (transform_aes_128_ctr(ctxt, b'YELLOW SUBMARINE', 0)
+            == b"Yo, VIP Let's kick it Ice, Ice, baby Ice, Ice, baby ")
+
+
+def test_aes_context_cache():
+    key = os.urandom(16)
+    before = libmatasano.aes_context_cache_info()
+    encrypt_aes_128_ecb(b'x' * 100, key)
+    encrypt_aes_128_ecb(b'y' * 100, key)
+    after = libmatasano.aes_context_cache_info()
+    assert after.misses == before.misses + 1
+    assert after.hits == before.hits + 1
+
+
+def test_cbc_bit_flipping():
+    for _ in range(20):
+        msg_length = randint(
+            BLOCK_SIZE + 1,  # bit flipping on short messages not implemented
+            4 * BLOCK_SIZE)
+        msg = os.urandom(msg_length)
+        key = os.urandom(16)
+        iv = os.urandom(16)
+        ctxt = encrypt_aes_128_cbc(msg, iv, key)
+        cryptogram = {'ctxt': ctxt, 'iv': iv}
+
+        pad_beginning = randint(BLOCK_SIZE, msg_length - 1)
+        # pad must not overflow on next block
+        # (not doable with CBC bit flipping)
+        max_pad_length = min(msg_length - pad_beginning,
+                             BLOCK_SIZE - (pad_beginning % BLOCK_SIZE))
+        pad_length = randint(1, max_pad_length)
+        pad = os.urandom(pad_length)
+
+        altered_cryptogram = cbc_xor(cryptogram, pad, pad_beginning)
+        result = decrypt_aes_128_cbc(altered_cryptogram['ctxt'],
+                                     altered_cryptogram['iv'], key)
+        expected = bxor(msg, b'\x00' * pad_beginning + pad)
+
+        # bit flipping will completely mess up one block of plaintext
+        # so we don't want to compare that
+        messed_up_block = (pad_beginning - BLOCK_SIZE) // BLOCK_SIZE
+        before_mess = slice(0, BLOCK_SIZE * messed_up_block)
+        after_mess = slice(BLOCK_SIZE * (messed_up_block + 1), None)
+
+        assert result[before_mess] == expected[before_mess]
+        assert result[after_mess] == expected[after_mess]
+
+
+def test_detect_ecb(use_numpy):
+    key = os.urandom(16)
+    records = [os.urandom(160) for _ in range(50)]
+    records[10] = encrypt_aes_128_ecb(b'A' * 64, key)
+    # misaligned: 5 bytes of header before the ciphertext
+    records[20] = os.urandom(5) + encrypt_aes_128_ecb(b'B' * 32 + os.urandom(20), key)
+    records[30] = os.urandom(3) + encrypt_aes_128_ecb(b'C' * 2000, key)
+
+    suspects = detect_ecb(iter(records), top_k=3)
+    assert [s['index'] for s in suspects] == [30, 10, 20]
+    assert suspects[0]['repeats'] == 2000 // 16 - 1
+    assert suspects[2]['offset'] == 5
+
+    assert libmatasano.test_ecb_128(records[10])
+    assert not libmatasano.test_ecb_128(records[20])
+
+
+@pytest.mark.parametrize('prefix_size', [0, 5, 16, 37])
+def test_byte_at_a_time_ecb(prefix_size):
+    key = os.urandom(16)
+    # a prefix and a target made of the bytes used to fill the messages
+    prefix = b'A' * prefix_size
+    target = b'AAAA' + os.urandom(40)
+
+    def encrypt(message):
+        return encrypt_aes_128_ecb(prefix + message + target, key)
+
+    layout = libmatasano.ecb_oracle_layout(encrypt)
+    assert layout['block_size'] == 16
+    assert layout['prefix_size'] == prefix_size
+    assert layout['target_size'] == len(target)
+    assert layout['queries'] <= 30
+
+    result = libmatasano.byte_at_a_time_ecb(encrypt, layout)
+    assert result['target'] == target
+    assert result['queries_per_byte'] == [1] * len(target)
+
+
+# oracles
+
+def test_instrumented_oracle():
+    calls = []
+
+    def oracle(message):
+        calls.append(message)
+        if message == b'bad':
+            raise ValueError('bad message')
+        return message[::-1]
+
+    instrumented = libmatasano.InstrumentedOracle(oracle, cache_size=2)
+    assert instrumented(b'abc') == b'cba'
+    assert instrumented(bytearray(b'abc')) == b'cba'
+    assert instrumented.map([b'x', b'abc', b'y', b'x']) == [b'x', b'cba', b'y', b'x']
+    with pytest.raises(ValueError):
+        instrumented(b'bad')
+    # b'abc' was pushed out of the cache by b'x' and b'y'
+    assert instrumented(b'abc') == b'cba'
+    assert calls == [b'abc', b'x', b'y', b'bad', b'abc']
+
+    stats = instrumented.stats()
+    assert stats['queries'] == 8
+    assert stats['cache_hits'] == 3
+    assert stats['oracle_queries'] == 5
+    assert stats['errors'] == 1
+    assert sum(stats['latency_histogram'].values()) == 5
+
+    uncached = libmatasano.InstrumentedOracle(oracle, cache=False)
+    uncached(b'abc')
+    uncached(b'abc')
+    assert uncached.stats()['cache_hits'] == 0
+
+
+def test_remote_oracle():
+    def oracle(message):
+        if message == b'bad':
+            raise ValueError('bad message')
+        return message[::-1]
+
+    oracles = {'reverse': oracle, 'long': lambda message: len(message) > 2}
+    with libmatasano.OracleServer(oracles, latency=0.001, jitter=0.001) as server:
+        with libmatasano.RemoteOracle(server.address, 'reverse', pipeline=8) as remote:
+            assert remote(b'abc') == b'cba'
+            assert remote(b'') == b''
+            with pytest.raises(libmatasano.OracleError, match='bad message'):
+                remote(b'bad')
+            # the connection is still usable after an error
+            messages = [os.urandom(randint(0, 40)) for _ in range(100)]
+            assert remote.map(messages) == [m[::-1] for m in messages]
+            with pytest.raises(libmatasano.OracleError):
+                remote.map([b'a', b'bad', b'c'])
+
+            instrumented = libmatasano.InstrumentedOracle(remote)
+            assert instrumented.map(messages + messages[:10]) == [
+                m[::-1] for m in messages + messages[:10]]
+            assert instrumented.stats()['oracle_queries'] == len(set(messages))
+
+        with libmatasano.RemoteOracle(server.address, 'long') as remote:
+            assert remote.map([b'ab', b'abc']) == [False, True]
+        with libmatasano.RemoteOracle(server.address, 'missing') as remote:
+            with pytest.raises(libmatasano.OracleError, match='unknown oracle'):
+                remote(b'')
+
+
+@pytest.mark.parametrize('length', [0, 1, 15, 16, 100])
+def test_attack_padding_oracle(use_numpy, length):
+    oracle = libmatasano.CBCPaddingOracle()
+    message = _TEXT[:length]
+    ctxt = oracle.encrypt(message)
+    assert oracle.map([ctxt, ctxt[:-1], ctxt[:16]]) == [True, False, False]
+
+    result = libmatasano.attack_padding_oracle(ctxt, oracle)
+    assert result['plaintext'] == message
+    assert len(result['queries_per_byte']) == len(ctxt) - BLOCK_SIZE
+    assert result['queries'] == sum(result['queries_per_byte'])
+    # english text is mostly found in the first wave of guesses
+    assert result['queries'] < 64 * len(result['queries_per_byte'])
+
+    # one query at a time, IV given apart
+    result = libmatasano.attack_padding_oracle(ctxt[16:], oracle.__call__, iv=ctxt[:16])
+    assert result['plaintext'] == message
+
+
+def test_attack_padding_oracle_false_positive():
+    # D(block)[14] == 2: with a forged byte 14 at 0, a 0x02 0x02 padding
+    # is also valid while guessing the last byte
+    key = os.urandom(16)
+    oracle = libmatasano.CBCPaddingOracle(key)
+    decryptor = libmatasano.aes_128_ecb_decryptor(key)
+    block = os.urandom(16)
+    while decryptor.update(block)[14] != 2:
+        block = os.urandom(16)
+    message = os.urandom(15) + b'\x01'
+    iv = bxor(decryptor.update(block), message)
+    result = libmatasano.attack_padding_oracle(block, oracle, iv=iv)
+    assert result['plaintext'] == message[:-1]
+
+
+def test_attack_padding_oracle_async_and_remote():
+    import asyncio
+
+    oracle = libmatasano.CBCPaddingOracle()
+    message = _TEXT[:70]
+    ctxt = oracle.encrypt(message)
+
+    async def async_oracle(message):
+        await asyncio.sleep(0.001)
+        return oracle(message)
+
+    result = asyncio.run(libmatasano.attack_padding_oracle_async(ctxt, async_oracle))
+    assert result['plaintext'] == message
+
+    with libmatasano.OracleServer({'padding': oracle}, latency=0.001) as server:
+        with libmatasano.RemoteOracle(server.address, 'padding') as remote:
+            result = libmatasano.attack_padding_oracle(ctxt, remote, concurrency=4)
+    assert result['plaintext'] == message
+
+
+# Mersenne Twister
+
+def test_mt19937_reference_outputs(use_numpy):
+    assert list(islice(MT19937_32(), 3)) == [3499211612, 581869302, 3890346734]
+
+
+def test_mt19937_same_as_random_module(use_numpy):
+    state = [random.getrandbits(32) for _ in range(MT19937.n)]
+    reference = random.Random()
+    reference.setstate((3, tuple(state) + (MT19937.n,), None))
+    mt = MT19937(state=state)
+    assert list(mt.random_words(1000)) == [reference.getrandbits(32) for _ in range(1000)]
+    assert mt.getrandbits(100) == reference.getrandbits(100)
+    assert mt.random_bytes(1001) == reference.randbytes(1001)
+
+
+def test_mt19937_bulk_same_as_generator(use_numpy):
+    words = list(islice(MT19937_32(1234), 1500))
+    mt = MT19937(1234)
+    assert list(mt.random_words(1)) + list(mt.random_words(1499)) == words
+
+
+def test_mt19937_clone(use_numpy):
+    mt = MT19937(random.getrandbits(32))
+    clone = clone_mt19937(mt.random_words(700))
+    assert clone.random_words(100) == mt.random_words(100)
+
+    keystream = mt.random_bytes(3001)
+    clone = clone_mt19937_from_bytes(keystream)
+    assert clone.random_bytes(100) == mt.random_bytes(100)
+
+    with pytest.raises(ValueError):
+        clone_mt19937(list(range(700)))
+
+
+# SHA-1
+
+@pytest.mark.parametrize('length', [0, 1, 55, 56, 63, 64, 65, 1000])
+def test_sha1(length):
+    msg = os.urandom(length)
+    assert sha1(msg) == hashlib.sha1(msg).digest()
+
+    h = SHA1()
+    for i in range(0, length, 7):
+        h.update(msg[i:i + 7])
+        assert h.copy().digest() == hashlib.sha1(msg[:i + 7]).digest()
+    assert h.hexdigest() == hashlib.sha1(msg).hexdigest()
+
+
+def test_sha1_midstate():
+    msg = os.urandom(128)
+    state, length = SHA1(msg).export_state()
+    h = SHA1(state=state, length=length)
+    h.update(b'suffix')
+    assert h.digest() == hashlib.sha1(msg + b'suffix').digest()
+
+
+def test_sha1_length_extension():
+    key = os.urandom(randint(0, 100))
+    msg = b'comment1=cooking%20MCs;userdata=foo;comment2=%20like%20a%20pound%20of%20bacon'
+    mac = sha1(key + msg)
+
+    def verifier(message, mac):
+        return sha1(key + message) == mac
+
+    key_length, forged_msg, forged_mac = forge_sha1_mac(
+        mac, msg, b';admin=true', verifier, range(101))
+    assert key_length == len(key)
+    assert forged_msg == msg + sha1_padding(len(key + msg)) + b';admin=true'
+    assert verifier(forged_msg, forged_mac)
+
+
+# RSA
+
+def test_is_probable_prime():
+    primes = {2, 3, 5, 7, 11, 13}
+    for n in range(14, 5000):
+        if all(n % p for p in primes if p * p <= n):
+            primes.add(n)
+    assert [n for n in range(5000) if libmatasano.is_probable_prime(n)] == sorted(primes)
+    # strong pseudoprime to the bases 2 to 37, and a Carmichael number
+    assert not libmatasano.is_probable_prime(3825123056546413051)
+    assert not libmatasano.is_probable_prime(561)
+    assert libmatasano.is_probable_prime(2 ** 127 - 1)
+    assert not libmatasano.is_probable_prime((2 ** 89 - 1) * (2 ** 107 - 1))
+
+
+def test_factorize():
+    assert libmatasano.factorize(1) == {}
+    assert libmatasano.factorize(2 ** 64 + 1) == {274177: 1, 67280421310721: 1}
+    assert libmatasano.factorize(1008 * 3642) == {2: 5, 3: 3, 7: 1, 607: 1}
+    assert libmatasano.factorize(1000003 ** 3 * 999983) == {999983: 1, 1000003: 3}
+
+
+def test_min_unconcealed_exponents():
+    result = libmatasano.min_unconcealed_exponents(1009, 3643)
+    assert result == {'unconcealed': 9, 'gcds': (2, 2),
+                      'nb_exponents': 217800, 'sum': 399788195976}
+
+
+@pytest.mark.parametrize('p, q', [(3, 5), (5, 7), (13, 37), (97, 193), (101, 17), (2, 11)])
+def test_unconcealed_brute_force(use_numpy, p, q):
+    phi = (p - 1) * (q - 1)
+    classes = {}
+    for e in range(2, phi):
+        if math.gcd(e, phi) == 1:
+            gcds = (math.gcd(e - 1, p - 1), math.gcd(e - 1, q - 1))
+            classes[gcds] = classes.get(gcds, 0) + 1
+            if p * q < 100:
+                assert libmatasano.unconcealed_messages(e, p, q) == sum(
+                    pow(m, e, p * q) == m for m in range(p * q))
+    assert libmatasano.unconcealed_classes(p, q) == classes
+    assert (libmatasano.min_unconcealed_exponents(p, q)
+            == libmatasano.min_unconcealed_exponents(p, q, brute_force=True, chunk_size=50))